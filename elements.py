@@ -1,39 +1,299 @@
 import logging
+import sys
+import time
+from contextlib import contextmanager
+from timeit import default_timer
 
 from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.common.exceptions import NoAlertPresentException, NoSuchElementException, TimeoutException, WebDriverException
+from selenium.common.exceptions import NoAlertPresentException, NoSuchElementException, TimeoutException, WebDriverException,\
+    StaleElementReferenceException
 from selenium.webdriver.common.by import By
 
+from .instrumentation import wasted_waits, call_site, command_budget, instrument
+
 logger = logging.getLogger(__name__)
 
 
-def is_element_present(driver, by_obj, what):
+class ImplicitWaitPolicy(object):
+    """
+    Remembers the implicit wait configured on a driver. Test sessions run
+    without one: a lookup answers at once and waiting for an element to
+    show up is left to the explicit timeout of wait_for_element.
+
+        ImplicitWaitPolicy().install(driver)
+
+    A driver given an implicit wait anyway has it dropped to zero around
+    the probes of is_element_present (unless wait_on_probes is set), so an
+    absent element does not cost the implicit timeout.
+    """
+
+    def __init__(self, timeout=0, wait_on_probes=False):
+        self.timeout = timeout
+        self.wait_on_probes = wait_on_probes
+
+    def install(self, driver):
+        driver.implicit_wait_policy = self
+        driver.implicitly_wait(self.timeout)
+        return self
+
+    @contextmanager
+    def suspended(self, driver):
+        if not self.timeout:
+            yield
+            return
+
+        driver.implicitly_wait(0)
+        try:
+            yield
+        finally:
+            driver.implicitly_wait(self.timeout)
+
+
+class NavigationTracker(object):
+    """
+    Remembers the user logged in, so repeated logins can be skipped.
+    Whatever ends the session behind its back has to call forget().
+    """
+
+    def __init__(self):
+        self.user = None
+
+    def install(self, driver):
+        driver.navigation = self
+        return self
+
+    def forget(self):
+        self.user = None
+
+
+SWITCH_TAB_SCRIPT = """
+var link = document.querySelector(arguments[0] + ' [href="#' + arguments[1] + '"]');
+if (!link) {
+    window.location.hash = arguments[1];
+} else if (window.jQuery) {
+    jQuery(link).click();
+} else {
+    link.click();
+}
+"""
+
+
+def switch_tab(driver, fragment, tabs_selector=''):
+    """
+    Show another tab of the current page by its #fragment instead of
+    loading a new page: clicks the tab link, or sets location.hash.
+    """
+    driver.execute_script(SWITCH_TAB_SCRIPT, tabs_selector, fragment)
+
+
+def _policy_owner(driver):
+    # page objects pass web elements as driver too, the policy lives on their parent
+    if getattr(driver, 'implicit_wait_policy', None) is None:
+        return getattr(driver, 'parent', driver)
+    return driver
+
+
+def get_implicit_wait_policy(driver):
+    return getattr(_policy_owner(driver), 'implicit_wait_policy', None)
+
+
+@contextmanager
+def no_implicit_wait(driver):
+    owner = _policy_owner(driver)
+    policy = getattr(owner, 'implicit_wait_policy', None)
+    if policy is None:
+        yield
+        return
+
+    with policy.suspended(owner):
+        yield
+
+
+# helpers which can wait, the wasted wait is charged to the code calling them
+WAIT_HELPERS = ('is_element_present', 'wait_for_element', 'is_element_present_until',
+                'wait_until', 'wait_for_network_idle', 'ajax_timeout')
+
+
+def record_wasted_wait(started):
+    wasted_waits.record(call_site(sys._getframe(1), WAIT_HELPERS), default_timer() - started)
+
+
+def is_element_present(driver, by_obj, what, wait=None):
+    """
+    wait=None lets the driver's ImplicitWaitPolicy decide whether the probe
+    may block for the implicit timeout; drivers without a policy keep it.
+    """
+    if wait is None:
+        policy = get_implicit_wait_policy(driver)
+        wait = policy is None or policy.wait_on_probes
+
+    started = default_timer()
     try:
-        driver.find_element(by=by_obj, value=what)
+        if wait:
+            driver.find_element(by=by_obj, value=what)
+        else:
+            with no_implicit_wait(driver):
+                driver.find_element(by=by_obj, value=what)
     except NoSuchElementException:
+        if wait:
+            record_wasted_wait(started)
         return False
     return True
 
+
+NETWORK_TRACKER_SCRIPT = """
+if (!window.__network) {
+    var network = window.__network = {pending: 0},
+        settle = function () {
+            network.pending = Math.max(0, network.pending - 1);
+            if (network.pending === 0) {
+                var event = document.createEvent('Event');
+                event.initEvent('network:idle', false, false);
+                document.dispatchEvent(event);
+            }
+        },
+        send = XMLHttpRequest.prototype.send;
+
+    XMLHttpRequest.prototype.send = function () {
+        network.pending++;
+        this.addEventListener('loadend', settle);
+        try {
+            return send.apply(this, arguments);
+        } catch (error) {
+            settle();
+            throw error;
+        }
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            network.pending++;
+            return fetch.apply(this, arguments).then(
+                function (response) { settle(); return response; },
+                function (error) { settle(); throw error; });
+        };
+    }
+}
+"""
+
+NETWORK_PENDING_SCRIPT = NETWORK_TRACKER_SCRIPT + """
+return window.__network.pending + (window.jQuery ? jQuery.active : 0);
+"""
+
+NETWORK_IDLE_SCRIPT = NETWORK_TRACKER_SCRIPT + """
+var done = arguments[arguments.length - 1], finished = false,
+    pending = function () {
+        return window.__network.pending + (window.jQuery ? jQuery.active : 0);
+    },
+    check = function () {
+        if (!finished && pending() === 0) {
+            finished = true;
+            document.removeEventListener('network:idle', check);
+            done(true);
+        }
+    };
+
+if (pending() === 0) {
+    done(true);
+    return;
+}
+document.addEventListener('network:idle', check);
+if (window.jQuery) {
+    jQuery(document).one('ajaxStop', check);
+}
+"""
+
+
+def install_network_tracker(driver):
+    """
+    Count pending XHR and fetch requests in the page. Call it after each
+    navigation; requests started before the tracker is installed are not
+    seen (the wait helpers install it on their own as well).
+    """
+    driver.execute_script(NETWORK_TRACKER_SCRIPT)
+
+
 def ajax_complete(driver):
+    # usable as a WebDriverWait condition
     try:
-        return 0 == driver.execute_script("return jQuery.active")
+        return 0 == driver.execute_script(NETWORK_PENDING_SCRIPT)
     except WebDriverException:
-        pass
+        # page is being unloaded
+        return False
+
 
+def set_script_timeout(driver, timeout):
+    # a round trip only when the session's timeout changes, not on every wait
+    owner = _policy_owner(driver)
+    if getattr(owner, 'script_timeout', None) != timeout:
+        owner.set_script_timeout(timeout)
+        owner.script_timeout = timeout
 
-def ajax_timeout(driver, timeout=1):
+
+# seconds the page gets to finish its requests, see wait_for_network_idle
+NETWORK_IDLE_TIMEOUT = 1
+
+
+def setup_driver(driver):
+    """
+    Set up a driver for the page objects, the same for Firefox and the fake
+    drivers: no implicit wait, the login tracker, the script timeout of
+    the network waits (so the first wait of a test does not have to send
+    it) and command timing in driver.command_profile.
+    """
+    ImplicitWaitPolicy().install(driver)
+    NavigationTracker().install(driver)
+    set_script_timeout(driver, NETWORK_IDLE_TIMEOUT)
+    instrument(driver)
+    return driver
+
+
+def wait_for_network_idle(driver, timeout=NETWORK_IDLE_TIMEOUT):
+    """
+    Block until jQuery and the request tracker report no pending requests,
+    resolved by their completion events instead of polling.
+    """
+    set_script_timeout(driver, timeout)
+    started = default_timer()
+    while True:
+        try:
+            driver.execute_async_script(NETWORK_IDLE_SCRIPT)
+            return
+        except TimeoutException:
+            break
+        except WebDriverException:
+            # the page unloaded under the script, ask the next one
+            if default_timer() - started >= timeout:
+                break
+            time.sleep(0.1)
+
+    record_wasted_wait(started)
+    raise TimeoutException("Timeout waiting for page to load")
+
+
+def ajax_timeout(driver, timeout=NETWORK_IDLE_TIMEOUT):
     #wait for ajax items to load
-    WebDriverWait(driver, timeout).until(
-             ajax_complete,  "Timeout waiting for page to load")
+    wait_for_network_idle(driver, timeout)
 
 
-def is_element_present_until(driver, locator, timeout=0):
+def wait_for_element(driver, locator, timeout=0):
+    """
+    Wait for the element and return it, or None when the timeout expires.
+    """
+    started = default_timer()
     try:
-        WebDriverWait(driver, timeout).until(lambda dr: dr.find_element(by=locator[0], value=locator[1]))
-    except TimeoutException:
-        return False
+        if not timeout:
+            # WebDriverWait sleeps a poll interval before giving up even then
+            return driver.find_element(by=locator[0], value=locator[1])
+        return WebDriverWait(driver, timeout).until(lambda dr: dr.find_element(by=locator[0], value=locator[1]))
+    except (TimeoutException, NoSuchElementException):
+        record_wasted_wait(started)
+        return None
+
+
+def is_element_present_until(driver, locator, timeout=0):
+    return wait_for_element(driver, locator, timeout) is not None
 
-    return True
 
 def is_alert_present(driver):
     try:
@@ -43,21 +303,86 @@ def is_alert_present(driver):
     return True
 
 
+def css_string(value):
+    # value quoted for a CSS attribute selector, special characters as hex escapes
+    value = u'{0}'.format(value)
+    for char in u'\\"\n\r':
+        value = value.replace(char, u'\\{0:x} '.format(ord(char)))
+    return u'"{0}"'.format(value)
+
+
+def data_locator(selector, data_id):
+    return (By.CSS_SELECTOR, u'{0}[data-id={1}]'.format(selector, css_string(data_id)))
+
+
+def wait_until(driver, condition, timeout=5, message=''):
+    started = default_timer()
+    try:
+        return WebDriverWait(driver, timeout).until(condition, message)
+    except TimeoutException:
+        record_wasted_wait(started)
+        raise
+
+
+class alert_present(object):
+    """
+    Wait condition returning the open alert.
+    """
+    def __call__(self, driver):
+        try:
+            return driver.switch_to.alert
+        except NoAlertPresentException:
+            return False
+
+
+class element_removed(object):
+    """
+    Wait condition true once nothing matches the locator anymore.
+    """
+    def __init__(self, locator):
+        self.locator = locator
+
+    def __call__(self, driver):
+        return not driver.find_elements(*self.locator)
+
+
+class text_changed(object):
+    """
+    Wait condition returning the element's text once it differs from text.
+    The element is looked up again on every poll, it may be re-rendered;
+    with child it is the child locator looked up inside the located element.
+    """
+    def __init__(self, locator, text, child=None):
+        self.locator = locator
+        self.text = text
+        self.child = child
+
+    def __call__(self, driver):
+        try:
+            elements = driver.find_elements(*self.locator)
+            if elements and self.child is not None:
+                elements = elements[0].find_elements(*self.child)
+            if elements and elements[0].text != self.text:
+                return elements[0].text
+        except StaleElementReferenceException:
+            pass
+        return False
+
+
 class BasePageElement(object):
     def __set__(self, obj, value):
-        driver = obj.driver
-        if not is_element_present_until(driver, self.locator, timeout=1):
+        element = wait_for_element(obj.driver, self.locator, timeout=1)
+        if element is None:
             raise NoSuchElementException
 
-        driver.find_element(*self.locator).clear()
-        driver.find_element(*self.locator).send_keys(value)
+        element.clear()
+        element.send_keys(value)
 
     def __get__(self, obj, owner):
-        driver = obj.driver
-        if not is_element_present_until(driver, self.locator, timeout=1):
+        element = wait_for_element(obj.driver, self.locator, timeout=1)
+        if element is None:
             raise NoSuchElementException
 
-        element = driver.find_element(*self.locator)
         return element.get_attribute("value")
 
 
@@ -69,9 +394,8 @@ class ToggleElement(object):
             locators = self.locator
 
         for loc in locators:
-            if is_element_present_until(driver, loc, timeout=3):
-                element = driver.find_element(*loc)
-            else:
+            element = wait_for_element(driver, loc, timeout=3)
+            if element is None:
                 raise NoSuchElementException
             element.click()
 
@@ -79,28 +403,29 @@ class ToggleElement(object):
 class EditPopupElement(object):
     def __set__(self, obj, value):
         driver = obj.driver
-        if is_element_present_until(driver, self.add_locator, timeout=0.5):
-            element = driver.find_element(*self.add_locator)
-        else:
+        element = wait_for_element(driver, self.add_locator, timeout=0.5)
+        if element is None:
             element = driver.find_element(*self.edit_locator)
         element.click()
-        driver.find_element(*self.text_area_locator).clear()
-        driver.find_element(*self.text_area_locator).send_keys(value)
+        text_area = wait_for_element(driver, self.text_area_locator, timeout=1)
+        if text_area is None:
+            raise NoSuchElementException
+        text_area.clear()
+        text_area.send_keys(value)
         driver.find_element(*self.submit_locator).click()
         ajax_timeout(driver)
 
     def __get__(self, obj, owner):
-        driver = obj.driver
-        if is_element_present_until(driver, self.locator, timeout=1):
-            return driver.find_element(*self.locator).text
+        element = wait_for_element(obj.driver, self.locator, timeout=1)
+        if element is not None:
+            return element.text
         return None
 
 
 class DescriptionEditorElement(object):
     def execute(self, driver, method, *args):
-        if is_element_present_until(driver, self.add_locator, timeout=0.5):
-            element = driver.find_element(*self.add_locator)
-        else:
+        element = wait_for_element(driver, self.add_locator, timeout=0.5)
+        if element is None:
             element = driver.find_element(*self.edit_locator)
 
         element.click()
@@ -128,8 +453,9 @@ class DescriptionEditorElement(object):
 
 class XMLEditorElement(object):
     def execute(self, driver, method, *args):
-        if is_element_present_until(driver, self.edit_locator, timeout=0.5):
-            element = driver.find_element(*self.edit_locator)
+        element = wait_for_element(driver, self.edit_locator, timeout=0.5)
+        if element is None:
+            raise NoSuchElementException
 
         element.click()
 
@@ -155,13 +481,82 @@ class XMLEditorElement(object):
         return self.execute(driver, 'getValue')
 
 
+FILL_FORM_SCRIPT = """
+var values = arguments[0], missing = [],
+    strip = function (text) { return (text || '').replace(/^\\s+|\\s+$/g, ''); },
+    fire = function (element, name) {
+        var event = document.createEvent('HTMLEvents');
+        event.initEvent(name, true, true);
+        element.dispatchEvent(event);
+    };
+
+for (var id in values) {
+    var element = document.getElementById(id), value = values[id];
+    if (!element) {
+        missing.push(id);
+        continue;
+    }
+    var tag = element.tagName.toLowerCase();
+    if (tag === 'select') {
+        var index = -1;
+        for (var i = 0; i < element.options.length; i++) {
+            if (strip(element.options[i].text) === value) {
+                index = i;
+                break;
+            }
+        }
+        if (index < 0) {
+            missing.push(id);
+            continue;
+        }
+        element.selectedIndex = index;
+    } else if (tag === 'input' && element.type === 'checkbox') {
+        // click() toggles the box and fires click and change itself
+        if (element.checked !== !!value) {
+            element.click();
+        }
+        continue;
+    } else if (tag === 'input' || tag === 'textarea') {
+        element.value = value === null ? '' : String(value);
+    } else {
+        continue;
+    }
+    fire(element, 'input');
+    fire(element, 'change');
+}
+return missing;
+"""
+
+
+FORM_VALUES_SCRIPT = """
+var ids = arguments[0], values = {}, missing = [];
+
+for (var i = 0; i < ids.length; i++) {
+    var element = document.getElementById(ids[i]);
+    if (!element) {
+        missing.push(ids[i]);
+        continue;
+    }
+    // same as get_attribute('value'): property first, then the attribute
+    values[ids[i]] = 'value' in element ? element.value : element.getAttribute('value');
+}
+return {values: values, missing: missing};
+"""
+
+
 class EditFormElement(object):
     """
     In inherited class define these attributes:
         fields = (,)
         form_link_locator = (By.ID, 'locator')
         submit_locator = (By.ID, 'locator')
+
+    Fields are filled in by a single script call; list fields which need
+    real keystrokes (autocompletes, key handlers) in typed_fields or set
+    fill_mode = 'keys' to type every field.
     """
+    fill_mode = 'script'
+    typed_fields = ()
 
     def open(self, driver, locator=None):
         self.data = None
@@ -172,9 +567,8 @@ class EditFormElement(object):
             locators = locator
 
         for loc in locators:
-            if is_element_present_until(driver, loc, timeout=0.5):
-                element = driver.find_element(*loc)
-            else:
+            element = wait_for_element(driver, loc, timeout=0.5)
+            if element is None:
                 raise NoSuchElementException
             element.click()
 
@@ -184,22 +578,39 @@ class EditFormElement(object):
             logger.error(fields_to_fill)
             raise NoSuchElementException
 
-        for field in fields_to_fill:
-            field_element = driver.find_element(By.ID, field)
-            try:
-                field_element.clear()
-            except WebDriverException as e:
-                logger.warning(e.msg)
-            if field_element.tag_name in ('input', 'textarea'):
-                if field_element.get_attribute('type') == 'checkbox':
-                    if field_element.is_selected() != values[field]:
-                        field_element.click()
-                else:
-                    field_element.click()
-                    field_element.send_keys(values[field])
-            elif field_element.tag_name == 'select':
-                self.select_field(field_element, values[field])
+        if self.fill_mode == 'keys':
+            typed = fields_to_fill
+        else:
+            typed = fields_to_fill.intersection(self.typed_fields)
+
+        scripted = fields_to_fill - typed
+        if scripted:
+            self.script_fill(driver, dict((f, values[f]) for f in scripted))
 
+        for field in typed:
+            self.type_field(driver, field, values[field])
+
+    def script_fill(self, driver, values):
+        missing = driver.execute_script(FILL_FORM_SCRIPT, values)
+        if missing:
+            logger.error(missing)
+            raise NoSuchElementException
+
+    def type_field(self, driver, field, value):
+        field_element = driver.find_element(By.ID, field)
+        try:
+            field_element.clear()
+        except WebDriverException as e:
+            logger.warning(e.msg)
+        if field_element.tag_name in ('input', 'textarea'):
+            if field_element.get_attribute('type') == 'checkbox':
+                if field_element.is_selected() != value:
+                    field_element.click()
+            else:
+                field_element.click()
+                field_element.send_keys(value)
+        elif field_element.tag_name == 'select':
+            self.select_field(field_element, value)
 
     def select_field(self, element, value):
         select = Select(element)
@@ -210,21 +621,25 @@ class EditFormElement(object):
         select.select_by_visible_text(value)
 
     def form_values(self, driver):
-        form_values = {}
-        for field in self.fields:
-            field_element = driver.find_element(By.ID, field)
-            form_values[field] = field_element.get_attribute("value")
-        return form_values
+        if not self.fields:
+            return {}
+
+        result = driver.execute_script(FORM_VALUES_SCRIPT, list(self.fields))
+        if result['missing']:
+            logger.error(result['missing'])
+            raise NoSuchElementException
+        return result['values']
 
+    @command_budget(5)
     def submit(self, driver):
         error_element = (By.CSS_SELECTOR, '.input-error')
         submit_btn = driver.find_element(*self.submit_locator)
         self.data = self.form_values(driver)
         submit_btn.click()
         ajax_timeout(driver)
-        if is_element_present_until(driver, error_element):
+        element = wait_for_element(driver, error_element)
+        if element is not None:
             error_msg = []
-            element = driver.find_element(*error_element)
             element_id = element.get_attribute('id')
             element_msg = driver.find_element(By.CSS_SELECTOR, '.tooltip-inner').text
             element_value = element.get_attribute('value')
@@ -252,3 +667,187 @@ class DataWrapper(object):
         return self.get_attribute('data-id')
 
 
+
+
+def data_element(driver, selector, data_id, wrapper=DataWrapper):
+    """
+    Find a single row by its data-id with one CSS attribute lookup instead
+    of scanning every row of the table.
+    """
+    elements = driver.find_elements(*data_locator(selector, data_id))
+    if not elements:
+        raise NoSuchElementException
+    return wrapper(elements[0])
+
+
+SCRAPE_ROWS_SCRIPT = """
+var rows = document.querySelectorAll(arguments[0]),
+    attributes = arguments[1], cell_selector = arguments[2], require_id = arguments[3],
+    strip = function (text) { return (text || '').replace(/^\\s+|\\s+$/g, ''); },
+    records = [];
+
+for (var i = 0; i < rows.length; i++) {
+    var row = rows[i], attrs = {}, cells = [];
+    if (require_id && !row.hasAttribute('data-id')) {
+        continue;
+    }
+    for (var j = 0; j < attributes.length; j++) {
+        attrs[attributes[j]] = row.getAttribute(attributes[j]);
+    }
+    if (cell_selector) {
+        var nodes = row.querySelectorAll(cell_selector);
+        for (var k = 0; k < nodes.length; k++) {
+            cells.push(strip(nodes[k].innerText));
+        }
+    }
+    records.push({index: i, id: row.getAttribute('data-id'),
+                  parent: row.getAttribute('data-parent'),
+                  text: strip(row.innerText), cells: cells, attributes: attrs});
+}
+return records;
+"""
+
+
+class RowRecord(object):
+    """
+    Snapshot of a row taken by scrape_rows. Anything not scraped is looked
+    up on the live element, which is only fetched when first needed.
+    """
+    __slots__ = ('driver', 'selector', 'index', 'data_id', 'parent_id', 'text',
+                 'cells', 'attributes', '_element')
+
+    def __init__(self, driver, selector, row):
+        self.driver = driver
+        self.selector = selector
+        self.index = row['index']
+        self.data_id = row['id']
+        self.parent_id = row['parent']
+        self.text = row['text']
+        self.cells = row['cells']
+        self.attributes = row['attributes']
+        self._element = None
+
+    @property
+    def element(self):
+        if self._element is None:
+            if self.data_id is not None:
+                self._element = data_element(self.driver, self.selector, self.data_id)
+            else:
+                rows = self.driver.find_elements(By.CSS_SELECTOR, self.selector)
+                if len(rows) <= self.index:
+                    raise NoSuchElementException
+                self._element = DataWrapper(rows[self.index])
+        return self._element
+
+    def get_attribute(self, name):
+        if name in self.attributes:
+            return self.attributes[name]
+        if name == 'data-id':
+            return self.data_id
+        if name == 'data-parent':
+            return self.parent_id
+        return self.element.get_attribute(name)
+
+    def __getattr__(self, attr):
+        return getattr(self.element, attr)
+
+
+def scrape_rows(driver, selector, attributes=(), cells=None, require_id=True,
+                record=RowRecord):
+    """
+    Read all rows matching selector (data-id, data-parent, text, text of
+    each cell matching cells and the listed attributes) in one script call.
+    """
+    rows = driver.execute_script(SCRAPE_ROWS_SCRIPT, selector, list(attributes),
+                                 cells, require_id)
+    return [record(driver, selector, row) for row in rows or []]
+
+
+TREE_SNAPSHOT_SCRIPT = """
+var root = document.querySelector(arguments[0]), leaf = arguments[1], branch = arguments[2],
+    strip = function (text) { return (text || '').replace(/^\\s+|\\s+$/g, ''); },
+    counters = {leaf: 0, branch: 0},
+    nodes = [];
+
+if (!root) {
+    return nodes;
+}
+var elements = root.querySelectorAll('.' + leaf + ', .' + branch);
+for (var i = 0; i < elements.length; i++) {
+    var el = elements[i], ancestors = [], label = '',
+        kind = el.classList.contains(branch) ? 'branch' : 'leaf';
+    for (var up = el.parentNode; up && up !== root; up = up.parentNode) {
+        if (up.classList && up.classList.contains(branch) && up.hasAttribute('data-id')) {
+            ancestors.push(up.getAttribute('data-id'));
+        }
+    }
+    // label is the node's own text, without its nested lists
+    for (var child = el.firstChild; child; child = child.nextSibling) {
+        if (child.nodeType === 3) {
+            label += child.textContent;
+        } else if (child.nodeType === 1 && child.tagName !== 'UL' && child.tagName !== 'OL') {
+            label += ' ' + child.innerText;
+        }
+    }
+    nodes.push({index: counters[kind]++, kind: kind, id: el.getAttribute('data-id'),
+                parent: el.getAttribute('data-parent'), ancestors: ancestors,
+                label: strip(label.replace(/\\s+/g, ' ')), text: strip(el.innerText),
+                cells: [], attributes: {}});
+}
+return nodes;
+"""
+
+
+class TreeNode(RowRecord):
+    __slots__ = ('kind', 'label', 'tree_parent_id', 'ancestor_ids')
+
+    def __init__(self, driver, selector, node):
+        super(TreeNode, self).__init__(driver, selector, node)
+        self.kind = node['kind']
+        self.label = node['label']
+        self.ancestor_ids = node['ancestors']
+        self.tree_parent_id = self.ancestor_ids[0] if self.ancestor_ids else None
+
+
+class TreeSnapshot(object):
+    """
+    Whole tree (ids, parent ids, leaf/branch kind, labels) read in a single
+    script call and indexed in memory by id and by parent branch.
+    """
+
+    def __init__(self, driver, root, leaf_class='tree-leaf', branch_class='tree-branch'):
+        selectors = {'leaf': '{0} .{1}'.format(root, leaf_class),
+                     'branch': '{0} .{1}'.format(root, branch_class)}
+        nodes = driver.execute_script(TREE_SNAPSHOT_SCRIPT, root, leaf_class, branch_class)
+
+        self.nodes = [TreeNode(driver, selectors[n['kind']], n) for n in nodes or []]
+        self.by_id = {}
+        self.by_parent = {}
+        for node in self.nodes:
+            if node.data_id is not None:
+                self.by_id[node.data_id] = node
+            self.by_parent.setdefault(node.tree_parent_id, []).append(node)
+
+    def node(self, data_id):
+        try:
+            return self.by_id[str(data_id)]
+        except KeyError:
+            raise NoSuchElementException
+
+    def children(self, parent=None, kind=None):
+        parent_id = self._parent_id(parent)
+        return [n for n in self.by_parent.get(parent_id, []) if kind in (None, n.kind)]
+
+    def descendants(self, parent=None, kind=None):
+        parent_id = self._parent_id(parent)
+        return [n for n in self.nodes if kind in (None, n.kind) and
+                (parent_id is None or parent_id in n.ancestor_ids)]
+
+    def _parent_id(self, parent):
+        # parent may be given as an id or as a row element
+        if parent is None:
+            return None
+        parent_id = str(getattr(parent, 'data_id', parent))
+        if parent_id not in self.by_id:
+            raise NoSuchElementException
+        return parent_id
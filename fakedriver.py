@@ -0,0 +1,686 @@
+import copy
+import itertools
+import json
+import os
+import re
+from collections import deque
+
+from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
+from selenium.webdriver.remote.command import Command
+
+try:
+    from lxml import html as lxml_html
+    from lxml.cssselect import CSSSelector
+except ImportError:
+    # only DomExecutor needs lxml (and cssselect)
+    lxml_html = None
+
+from .elements import (setup_driver, NETWORK_TRACKER_SCRIPT,
+        NETWORK_PENDING_SCRIPT, NETWORK_IDLE_SCRIPT, SWITCH_TAB_SCRIPT, FILL_FORM_SCRIPT,
+        FORM_VALUES_SCRIPT, SCRAPE_ROWS_SCRIPT, TREE_SNAPSHOT_SCRIPT)
+from .instrumentation import recording_path, LIVE_SERVER, SESSION_FILE
+
+text_type = type(u'')
+
+
+# status codes of the JSON wire protocol, selenium raises the matching exceptions
+SUCCESS = 0
+NO_SUCH_ELEMENT = 7
+STALE_ELEMENT_REFERENCE = 10
+UNKNOWN_COMMAND = 9
+JAVASCRIPT_ERROR = 17
+TIMEOUT = 21
+NO_ALERT_OPEN = 27
+SCRIPT_TIMEOUT = 28
+
+
+class FakeError(Exception):
+    def __init__(self, status, message=''):
+        super(FakeError, self).__init__(message)
+        self.status = status
+        self.message = message
+
+
+class FakeExecutor(object):
+    """
+    Command executor answering a WebDriver in place of a browser. Commands
+    are dispatched to the methods named in handlers, which get the command
+    parameters as keyword arguments and return the response value or raise
+    FakeError. Commands without a handler succeed with no value.
+    """
+    session_id = 'fake-session'
+
+    handlers = {
+        Command.GET: 'get',
+        Command.GET_CURRENT_URL: 'current_url',
+        Command.FIND_ELEMENT: 'find_element',
+        Command.FIND_ELEMENTS: 'find_elements',
+        Command.FIND_CHILD_ELEMENT: 'find_element',
+        Command.FIND_CHILD_ELEMENTS: 'find_elements',
+        Command.EXECUTE_SCRIPT: 'execute_script',
+        Command.EXECUTE_ASYNC_SCRIPT: 'execute_async_script',
+        Command.GET_ALERT_TEXT: 'alert_text',
+        Command.ACCEPT_ALERT: 'accept_alert',
+        Command.DISMISS_ALERT: 'dismiss_alert',
+        Command.CLICK_ELEMENT: 'click',
+        Command.CLEAR_ELEMENT: 'clear',
+        Command.SEND_KEYS_TO_ELEMENT: 'send_keys',
+        Command.GET_ELEMENT_TEXT: 'text',
+        Command.GET_ELEMENT_TAG_NAME: 'tag_name',
+        Command.GET_ELEMENT_ATTRIBUTE: 'get_attribute',
+        Command.IS_ELEMENT_DISPLAYED: 'is_displayed',
+        Command.IS_ELEMENT_SELECTED: 'is_selected',
+        Command.IS_ELEMENT_ENABLED: 'is_enabled',
+    }
+
+    def __init__(self):
+        self.url = 'about:blank'
+        self.ids = itertools.count(1)
+
+    def execute(self, command, params):
+        params = dict(params or {})
+        params.pop('sessionId', None)
+        if command == Command.NEW_SESSION:
+            return {'status': SUCCESS, 'sessionId': self.session_id,
+                    'value': {'browserName': 'fake'}}
+
+        handler = self.handlers.get(command)
+        try:
+            value = getattr(self, handler)(**params) if handler else None
+        except FakeError as e:
+            return {'status': e.status, 'value': {'message': e.message}}
+        return {'status': SUCCESS, 'sessionId': self.session_id, 'value': value}
+
+    def reference(self, element_id):
+        # element as sent over the wire, the driver wraps it into a WebElement
+        return {'ELEMENT': str(element_id)}
+
+    def get(self, url):
+        self.url = url
+
+    def current_url(self):
+        return self.url
+
+    def find_element(self, using, value, id=None):
+        elements = self.find_elements(using, value, id)
+        if not elements:
+            raise FakeError(NO_SUCH_ELEMENT, 'Unable to locate element: {0}={1}'.format(using, value))
+        return elements[0]
+
+    def alert_text(self):
+        raise FakeError(NO_ALERT_OPEN, 'No alert is present')
+
+    def accept_alert(self):
+        self.alert_text()
+
+    def dismiss_alert(self):
+        self.alert_text()
+
+
+class StubExecutor(FakeExecutor):
+    """
+    Finds every element it is asked for, except those whose locator value
+    is listed in absent; scripts are answered from the scripts dict (keyed
+    by the script text, values may be callables taking the script
+    arguments) and return None otherwise.
+    """
+
+    def __init__(self, absent=(), scripts=None, alert=None):
+        super(StubExecutor, self).__init__()
+        self.absent = set(absent)
+        self.scripts = scripts or {}
+        self.alert = alert
+
+    def find_elements(self, using, value, id=None):
+        if value in self.absent:
+            return []
+        return [self.reference(next(self.ids))]
+
+    def execute_script(self, script, args):
+        result = self.scripts.get(script)
+        return result(*args) if callable(result) else result
+
+    def execute_async_script(self, script, args):
+        return self.execute_script(script, args)
+
+    def alert_text(self):
+        if self.alert is None:
+            super(StubExecutor, self).alert_text()
+        return self.alert
+
+    def accept_alert(self):
+        self.alert_text()
+        self.alert = None
+
+    dismiss_alert = accept_alert
+
+    def click(self, id):
+        pass
+
+    def clear(self, id):
+        pass
+
+    def send_keys(self, id, value, text=None):
+        pass
+
+    def text(self, id):
+        return ''
+
+    def tag_name(self, id):
+        return 'div'
+
+    def get_attribute(self, id, name):
+        return None
+
+    def is_displayed(self, id):
+        return True
+
+    def is_selected(self, id):
+        return False
+
+    def is_enabled(self, id):
+        return True
+
+
+EMPTY_PAGE = '<html><head></head><body></body></html>'
+
+# snippets page objects build on the fly, with their string arguments
+CKEDITOR_SCRIPT = re.compile(r"CKEDITOR\.instances\['([^']*)'\]\.(\w+)\((.*)\);?\s*$", re.S)
+XML_EDITOR_SCRIPT = re.compile(r"window\.xml_editor\.(\w+)\((.*)\);?\s*$", re.S)
+ADD_CLASS_SCRIPT = re.compile(r"\$\('([^']*)'\)\.addClass\('([^']*)'\);?\s*$")
+JQUERY_ACTIVE_SCRIPT = re.compile(r"jQuery\.active;?\s*$")
+STRING_ARGUMENT = re.compile(r"'((?:[^'\\]|\\.)*)'")
+
+
+def collapse(text):
+    return ' '.join((text or '').split())
+
+
+def has_class(element, name):
+    return name in (element.get('class') or '').split()
+
+
+class DomExecutor(FakeExecutor):
+    """
+    Browser emulation on top of an lxml document: element lookups by every
+    locator strategy, attributes and text, clicks on form controls and tab
+    links, alerts, and the scripts of elements.py (form filling, row and
+    tree scraping, network waits) implemented in Python.
+
+        executor = DomExecutor({'http://testserver/docs': DOCS_HTML})
+        driver = fake_driver(executor)
+
+    Pages are given as html text or as callables taking the url. There is
+    no stylesheet: is_displayed only knows the hidden attribute, inline
+    display:none and the hide/hidden classes. Page behaviour is added with
+    on_click(selector, handler) and on_script(script or regex, handler),
+    handlers get the executor and the element or the script arguments and
+    regex match. CKEditor instances and window.xml_editor keep their text in
+    editors and xml_editor; alert holds the text of an open alert and
+    on_alert_accept what happens when it is accepted.
+
+    The scripts are never run: tests against DomExecutor cover the page
+    objects, not the JavaScript, which ScriptTest in tests.py runs in
+    Firefox. The emulation is close, not exact: text is text_content()
+    with whitespace collapsed rather than the rendered innerText, so
+    hidden elements count and line breaks are lost.
+    """
+
+    def __init__(self, pages=None, html=None, url='about:blank'):
+        if lxml_html is None:
+            raise ImportError('DomExecutor needs lxml and cssselect')
+        super(DomExecutor, self).__init__()
+        self.pages = pages or {}
+        self.click_handlers = []
+        self.script_handlers = [
+            (NETWORK_TRACKER_SCRIPT, lambda dom, args, match: None),
+            (NETWORK_PENDING_SCRIPT, lambda dom, args, match: dom.pending),
+            (NETWORK_IDLE_SCRIPT, lambda dom, args, match: dom.network_idle()),
+            (SWITCH_TAB_SCRIPT, lambda dom, args, match: dom.switch_tab(*args)),
+            (FILL_FORM_SCRIPT, lambda dom, args, match: dom.fill_form(*args)),
+            (FORM_VALUES_SCRIPT, lambda dom, args, match: dom.form_values(*args)),
+            (SCRAPE_ROWS_SCRIPT, lambda dom, args, match: dom.scrape_rows(*args)),
+            (TREE_SNAPSHOT_SCRIPT, lambda dom, args, match: dom.tree_snapshot(*args)),
+            (CKEDITOR_SCRIPT, lambda dom, args, match: dom.ckeditor(*match.groups())),
+            (XML_EDITOR_SCRIPT, lambda dom, args, match: dom.xml_editor_call(*match.groups())),
+            (ADD_CLASS_SCRIPT, lambda dom, args, match: dom.add_class(*match.groups())),
+            (JQUERY_ACTIVE_SCRIPT, lambda dom, args, match: dom.pending),
+        ]
+        # requests in flight as seen by jQuery.active and the network tracker
+        self.pending = 0
+        self.editors = {}
+        self.xml_editor = ''
+        self.alert = None
+        self.on_alert_accept = None
+        self.load(html or EMPTY_PAGE, url)
+
+    # page and element bookkeeping
+
+    def load(self, html, url=None):
+        self.document = lxml_html.document_fromstring(html)
+        self.elements = {}
+        self.element_ids = {}
+        if url is not None:
+            self.url = url
+
+    def get(self, url):
+        page = self.pages.get(url, self.pages.get(url.split('#')[0], EMPTY_PAGE))
+        self.load(page(url) if callable(page) else page, url)
+
+    def reference(self, element):
+        if element not in self.element_ids:
+            element_id = text_type(next(self.ids))
+            self.element_ids[element] = element_id
+            self.elements[element_id] = element
+        return super(DomExecutor, self).reference(self.element_ids[element])
+
+    def element(self, id):
+        element = self.elements.get(id)
+        if element is None or not self.attached(element):
+            raise FakeError(STALE_ELEMENT_REFERENCE, 'Element is no longer attached to the DOM')
+        return element
+
+    def attached(self, element):
+        # removed elements keep their document, but not their parent
+        while element.getparent() is not None:
+            element = element.getparent()
+        return element is self.document
+
+    def wire(self, value):
+        # script results as a browser sends them, elements become references
+        if isinstance(value, dict):
+            return dict((k, self.wire(v)) for k, v in value.items())
+        if isinstance(value, (list, tuple)):
+            return [self.wire(v) for v in value]
+        if lxml_html is not None and isinstance(value, lxml_html.HtmlElement):
+            return self.reference(value)
+        return value
+
+    def unwire(self, value):
+        if isinstance(value, dict):
+            if 'ELEMENT' in value:
+                return self.element(value['ELEMENT'])
+            return dict((k, self.unwire(v)) for k, v in value.items())
+        if isinstance(value, list):
+            return [self.unwire(v) for v in value]
+        return value
+
+    def select(self, selector, scope=None):
+        scope = self.document if scope is None else scope
+        return [e for e in CSSSelector(selector)(scope) if e is not scope]
+
+    def by_id(self, element_id):
+        found = self.document.xpath('//*[@id=$id]', id=element_id)
+        return found[0] if found else None
+
+    # locating elements
+
+    def find_elements(self, using, value, id=None):
+        scope = self.document if id is None else self.element(id)
+        if using == 'css selector':
+            found = self.select(value, scope)
+        elif using == 'id':
+            found = scope.xpath('.//*[@id=$v]', v=value)
+        elif using == 'name':
+            found = scope.xpath('.//*[@name=$v]', v=value)
+        elif using == 'class name':
+            found = [e for e in scope.iterdescendants() if has_class(e, value)]
+        elif using == 'tag name':
+            found = list(scope.iterdescendants(value))
+        elif using == 'link text':
+            found = [e for e in scope.iterdescendants('a') if collapse(e.text_content()) == value]
+        elif using == 'partial link text':
+            found = [e for e in scope.iterdescendants('a') if value in collapse(e.text_content())]
+        elif using == 'xpath':
+            found = [e for e in scope.xpath(value) if e is not scope]
+        else:
+            raise FakeError(UNKNOWN_COMMAND, 'Unknown locator strategy {0}'.format(using))
+        return [self.reference(e) for e in found]
+
+    # element state
+
+    def get_value(self, element):
+        if element.tag == 'textarea':
+            return element.text or ''
+        if element.tag == 'select':
+            selected = self.selected_option(element)
+            return None if selected is None else self.get_value(selected)
+        if element.tag == 'option' and element.get('value') is None:
+            return collapse(element.text_content())
+        return element.get('value')
+
+    def set_value(self, element, value):
+        if element.tag == 'textarea':
+            element.text = value
+        else:
+            element.set('value', value)
+
+    def selected_option(self, select):
+        options = list(select.iter('option'))
+        for option in options:
+            if option.get('selected') is not None:
+                return option
+        return options[0] if options else None
+
+    def select_option(self, option):
+        select = next(option.iterancestors('select'), None)
+        if select is not None and select.get('multiple') is None:
+            for other in select.iter('option'):
+                other.attrib.pop('selected', None)
+        option.set('selected', 'selected')
+
+    def is_checked(self, element):
+        if element.tag == 'option':
+            return self.selected_option(next(element.iterancestors('select'))) is element
+        return element.get('checked') is not None
+
+    def text(self, id):
+        return collapse(self.element(id).text_content()) if self.is_displayed(id) else ''
+
+    def tag_name(self, id):
+        return self.element(id).tag
+
+    def get_attribute(self, id, name):
+        # like the browser: properties first, boolean attributes as 'true' or None
+        element = self.element(id)
+        if name == 'value':
+            return self.get_value(element)
+        if name in ('checked', 'selected'):
+            return 'true' if self.is_checked(element) else None
+        if name in ('disabled', 'readonly', 'multiple', 'hidden'):
+            return 'true' if element.get(name) is not None else None
+        return element.get(name)
+
+    def is_displayed(self, id):
+        element = self.element(id)
+        if element.tag == 'input' and element.get('type') == 'hidden':
+            return False
+        for e in [element] + list(element.iterancestors()):
+            style = (e.get('style') or '').replace(' ', '').lower()
+            if (e.get('hidden') is not None or 'display:none' in style or
+                    has_class(e, 'hide') or has_class(e, 'hidden')):
+                return False
+        return True
+
+    def is_selected(self, id):
+        return self.is_checked(self.element(id))
+
+    def is_enabled(self, id):
+        return self.element(id).get('disabled') is None
+
+    # interaction
+
+    def on_click(self, selector, handler):
+        self.click_handlers.append((selector, handler))
+
+    def click(self, id):
+        self.click_element(self.element(id))
+
+    def click_element(self, element):
+        if element.tag == 'input' and element.get('type') == 'checkbox':
+            if self.is_checked(element):
+                element.attrib.pop('checked')
+            else:
+                element.set('checked', 'checked')
+        elif element.tag == 'input' and element.get('type') == 'radio':
+            for other in self.document.xpath('//input[@type="radio"][@name=$n]', n=element.get('name')):
+                other.attrib.pop('checked', None)
+            element.set('checked', 'checked')
+        elif element.tag == 'option':
+            self.select_option(element)
+        elif element.tag == 'a' and (element.get('href') or '').startswith('#'):
+            self.url = self.url.split('#')[0] + element.get('href')
+
+        for selector, handler in self.click_handlers:
+            if element in CSSSelector(selector)(self.document):
+                handler(self, element)
+
+    def clear(self, id):
+        self.set_value(self.element(id), '')
+
+    def send_keys(self, id, value, text=None):
+        element = self.element(id)
+        self.set_value(element, (self.get_value(element) or '') + ''.join(value))
+
+    def alert_text(self):
+        if self.alert is None:
+            super(DomExecutor, self).alert_text()
+        return self.alert
+
+    def accept_alert(self):
+        self.dismiss_alert()
+        if self.on_alert_accept is not None:
+            handler, self.on_alert_accept = self.on_alert_accept, None
+            handler(self)
+
+    def dismiss_alert(self):
+        self.alert_text()
+        self.alert = None
+
+    # scripts
+
+    def on_script(self, script, handler):
+        # the latest handler wins, also over the built in ones
+        self.script_handlers.insert(0, (script, handler))
+
+    def execute_script(self, script, args):
+        args = self.unwire(args)
+        for pattern, handler in self.script_handlers:
+            if hasattr(pattern, 'match'):
+                match = pattern.search(script)
+                if match is None:
+                    continue
+            elif pattern != script:
+                continue
+            else:
+                match = None
+            return self.wire(handler(self, args, match))
+        raise FakeError(JAVASCRIPT_ERROR, 'No handler for script: {0}'.format(collapse(script)[:80]))
+
+    def execute_async_script(self, script, args):
+        return self.execute_script(script, args)
+
+    def network_idle(self):
+        if self.pending:
+            raise FakeError(SCRIPT_TIMEOUT, 'Timed out waiting for asynchronous script result')
+        return True
+
+    def switch_tab(self, tabs_selector, fragment):
+        links = self.select('{0} [href="#{1}"]'.format(tabs_selector, fragment))
+        if links:
+            self.click_element(links[0])
+        else:
+            self.url = '{0}#{1}'.format(self.url.split('#')[0], fragment)
+
+    def fill_form(self, values):
+        missing = []
+        for field_id, value in values.items():
+            element = self.by_id(field_id)
+            if element is None:
+                missing.append(field_id)
+            elif element.tag == 'select':
+                options = [o for o in element.iter('option') if collapse(o.text_content()) == value]
+                if not options:
+                    missing.append(field_id)
+                else:
+                    self.select_option(options[0])
+            elif element.tag == 'input' and element.get('type') == 'checkbox':
+                if self.is_checked(element) != bool(value):
+                    self.click_element(element)
+            elif element.tag in ('input', 'textarea'):
+                self.set_value(element, '' if value is None else text_type(value))
+        return missing
+
+    def form_values(self, ids):
+        values = {}
+        missing = []
+        for field_id in ids:
+            element = self.by_id(field_id)
+            if element is None:
+                missing.append(field_id)
+            else:
+                values[field_id] = self.get_value(element)
+        return {'values': values, 'missing': missing}
+
+    def scrape_rows(self, selector, attributes, cell_selector, require_id):
+        records = []
+        for i, row in enumerate(self.select(selector)):
+            if require_id and row.get('data-id') is None:
+                continue
+            cells = [collapse(c.text_content()) for c in self.select(cell_selector, row)] if cell_selector else []
+            records.append({'index': i, 'id': row.get('data-id'), 'parent': row.get('data-parent'),
+                            'text': collapse(row.text_content()), 'cells': cells,
+                            'attributes': dict((a, row.get(a)) for a in attributes)})
+        return records
+
+    def tree_snapshot(self, root_selector, leaf, branch):
+        roots = self.select(root_selector)
+        if not roots:
+            return []
+        root = roots[0]
+        counters = {'leaf': 0, 'branch': 0}
+        nodes = []
+        for element in root.iterdescendants():
+            if not (has_class(element, leaf) or has_class(element, branch)):
+                continue
+            kind = 'branch' if has_class(element, branch) else 'leaf'
+            ancestors = []
+            for up in element.iterancestors():
+                if up is root:
+                    break
+                if has_class(up, branch) and up.get('data-id') is not None:
+                    ancestors.append(up.get('data-id'))
+            # label is the node's own text, without its nested lists
+            label = element.text or ''
+            for child in element:
+                if child.tag not in ('ul', 'ol'):
+                    label += ' ' + child.text_content()
+                label += child.tail or ''
+            nodes.append({'index': counters[kind], 'kind': kind, 'id': element.get('data-id'),
+                          'parent': element.get('data-parent'), 'ancestors': ancestors,
+                          'label': collapse(label), 'text': collapse(element.text_content()),
+                          'cells': [], 'attributes': {}})
+            counters[kind] += 1
+        return nodes
+
+    def ckeditor(self, name, method, arguments):
+        args = STRING_ARGUMENT.findall(arguments)
+        if method == 'setData':
+            self.editors[name] = args[0] if args else ''
+        elif method == 'getData':
+            return self.editors.get(name, '')
+        else:
+            raise FakeError(JAVASCRIPT_ERROR, 'CKEditor method {0} is not emulated'.format(method))
+
+    def xml_editor_call(self, method, arguments):
+        args = STRING_ARGUMENT.findall(arguments)
+        if method == 'setValue':
+            self.xml_editor = args[0] if args else ''
+        elif method == 'getValue':
+            return self.xml_editor
+        else:
+            raise FakeError(JAVASCRIPT_ERROR, 'xml_editor method {0} is not emulated'.format(method))
+
+    def add_class(self, selector, name):
+        for element in self.select(selector):
+            if not has_class(element, name):
+                element.set('class', ((element.get('class') or '') + ' ' + name).strip())
+
+
+class ReplayMismatch(AssertionError):
+    pass
+
+
+# commands polling waits send over and over, their number depends on timing
+POLLING_COMMANDS = frozenset([
+    Command.FIND_ELEMENT, Command.FIND_ELEMENTS, Command.FIND_CHILD_ELEMENT,
+    Command.FIND_CHILD_ELEMENTS, Command.EXECUTE_SCRIPT, Command.W3C_EXECUTE_SCRIPT,
+    Command.GET_ALERT_TEXT, Command.W3C_GET_ALERT_TEXT, Command.GET_ELEMENT_TEXT,
+    Command.IS_ELEMENT_DISPLAYED,
+])
+
+
+def request_key(command, params):
+    # what has to match between the recording and the replay
+    params = dict(params or {})
+    params.pop('sessionId', None)
+    if command == Command.ADD_COOKIE:
+        # session keys are new in every run
+        params['cookie'] = dict(params['cookie'], value=None)
+    return command, json.dumps(params, sort_keys=True)
+
+
+class ReplayExecutor(FakeExecutor):
+    """
+    Serves the browser responses saved by instrumentation.record, so a
+    test reruns without a browser. start(test, base_url) loads the test's
+    recording; every command must then be the next recorded one, anything
+    else raises ReplayMismatch, which makes a replay a regression check of
+    the commands page objects send. Polling waits may repeat a lookup
+    more or less often than during the recording, such repeats are
+    tolerated. Commands outside start() and stop() (browser pool resets)
+    succeed with no value.
+    """
+
+    def __init__(self, directory):
+        super(ReplayExecutor, self).__init__()
+        self.directory = directory
+        with open(os.path.join(directory, SESSION_FILE)) as f:
+            self.session = json.load(f)
+        self.test = None
+        self.entries = None
+
+    def start(self, test, base_url=None):
+        with open(recording_path(self.directory, test)) as f:
+            text = f.read()
+        if base_url:
+            text = text.replace(LIVE_SERVER, base_url)
+        self.test = test
+        self.entries = deque(json.loads(text)['commands'])
+        self.last = None
+        self.failed = False
+
+    def stop(self):
+        entries, self.entries = self.entries, None
+        if entries and not self.failed:
+            raise ReplayMismatch('{0}: {1} recorded commands were not sent, the next one is {2}'.format(
+                self.test, len(entries), entries[0]['command']))
+
+    def execute(self, command, params):
+        if command == Command.NEW_SESSION:
+            return copy.deepcopy(self.session)
+        if self.entries is None:
+            return {'status': SUCCESS, 'value': None}
+
+        key = request_key(command, params)
+        if self.last is not None and key == self.last[0] and command in POLLING_COMMANDS:
+            # the wait polled once more than it did during the recording
+            if not self.entries or request_key(self.entries[0]['command'], self.entries[0]['params']) != key:
+                return copy.deepcopy(self.last[1])
+
+        expected = None
+        while self.entries:
+            entry = self.entries.popleft()
+            expected = request_key(entry['command'], entry['params'])
+            if expected == key:
+                self.last = (key, entry['response'])
+                return copy.deepcopy(entry['response'])
+            if self.last is None or expected != self.last[0] or entry['command'] not in POLLING_COMMANDS:
+                break
+            # the wait polled less often than it did during the recording
+
+        self.failed = True
+        raise ReplayMismatch('{0}: sent {1} {2}, the recording has {3}'.format(
+            self.test, command, key[1], ' '.join(expected) if expected else 'no more commands'))
+
+
+def fake_driver(executor=None):
+    """
+    A remote WebDriver talking to executor (a StubExecutor by default, or
+    a DomExecutor), set up by elements.setup_driver like the Firefox
+    drivers of tests.create_driver, so driver.command_profile counts the
+    commands page objects would send to a browser.
+    """
+    driver = RemoteWebDriver(command_executor=executor or StubExecutor(),
+                             desired_capabilities={'browserName': 'fake'})
+    return setup_driver(driver)
@@ -0,0 +1,274 @@
+import json
+import os
+import sys
+import threading
+from timeit import default_timer
+
+
+# modules whose functions count as the origin of a command, most specific first
+ORIGIN_MODULES = ('page', 'elements', 'tests')
+
+
+def frame_name(frame):
+    code = frame.f_code
+    instance = frame.f_locals.get('self')
+    if instance is not None:
+        return '{0}.{1}'.format(type(instance).__name__, code.co_name)
+    return code.co_name
+
+
+def command_origin(frame):
+    """
+    Name of the page object method a command was sent from, e.g.
+    'DocumentsTab.create_document'; an elements.py helper or the test
+    method itself when no page object was involved.
+    """
+    origins = {}
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '').rsplit('.', 1)[-1]
+        if module in ORIGIN_MODULES and module not in origins:
+            origins[module] = frame_name(frame)
+        frame = frame.f_back
+    for module in ORIGIN_MODULES:
+        if module in origins:
+            return origins[module]
+    return 'unknown'
+
+
+def call_site(frame, skip=()):
+    # first frame not belonging to a function named in skip, as 'page.py:412 FavouritesMenu.menu_element'
+    while frame.f_back is not None and frame.f_code.co_name in skip:
+        frame = frame.f_back
+    return '{0}:{1} {2}'.format(os.path.basename(frame.f_code.co_filename), frame.f_lineno,
+                                frame_name(frame))
+
+
+def command_detail(command, params):
+    # enough to recognize the call in a report, scripts are cut short
+    if 'using' in params:
+        return '{0}={1}'.format(params['using'], params['value'])
+    if 'script' in params:
+        return ' '.join(params['script'].split())[:80]
+    if 'url' in params:
+        return params['url']
+    return None
+
+
+class CommandProfile(object):
+    """
+    Timings of the commands a driver sent since start(), summarized by
+    report() as
+
+        {"test": ..., "commands": 42, "wire_time": 1.93,
+         "by_command": {"findElement": {"count": 12, "time": 0.4}, ...},
+         "by_origin": {"DocumentsTab.create_document": {...}, ...},
+         "slowest": [{"command": ..., "detail": ..., "origin": ..., "time": ...}]}
+    """
+    slowest = 5
+
+    def __init__(self):
+        self.test = None
+        self.records = []
+
+    def start(self, test):
+        self.test = test
+        self.records = []
+
+    def record(self, command, params, duration, origin):
+        self.records.append({
+            'command': command,
+            'detail': command_detail(command, params or {}),
+            'origin': origin,
+            'time': round(duration, 4),
+        })
+
+    def report(self):
+        by_command = {}
+        by_origin = {}
+        for record in self.records:
+            for totals, key in ((by_command, record['command']), (by_origin, record['origin'])):
+                entry = totals.setdefault(key, {'count': 0, 'time': 0})
+                entry['count'] += 1
+                entry['time'] = round(entry['time'] + record['time'], 4)
+
+        return {
+            'test': self.test,
+            'commands': len(self.records),
+            'wire_time': round(sum(r['time'] for r in self.records), 4),
+            'by_command': by_command,
+            'by_origin': by_origin,
+            'slowest': sorted(self.records, key=lambda r: r['time'], reverse=True)[:self.slowest],
+        }
+
+    def finish(self):
+        report = self.report()
+        self.start(None)
+        return report
+
+
+def command_budget(commands):
+    """
+    Declare the most WebDriver commands a page object method may send,
+    checked by CommandBudgetTest in tests.py:
+
+        @command_budget(11)
+        def create_document(self, data_dict, parent=None):
+    """
+    def decorator(method):
+        method.command_budget = commands
+        return method
+    return decorator
+
+
+class InstrumentedExecutor(object):
+    """
+    Stands in for a driver's command executor, timing every command on its
+    way to the browser.
+    """
+
+    def __init__(self, executor, profile):
+        self.executor = executor
+        self.profile = profile
+
+    def execute(self, command, params):
+        started = default_timer()
+        try:
+            return self.executor.execute(command, params)
+        finally:
+            duration = default_timer() - started
+            self.profile.record(command, params, duration, command_origin(sys._getframe(1)))
+
+    def __getattr__(self, name):
+        return getattr(self.executor, name)
+
+
+def instrument(driver, profile=None):
+    """
+    Route the driver's commands through an InstrumentedExecutor; the
+    profile is available as driver.command_profile.
+    """
+    if getattr(driver, 'command_profile', None) is not None:
+        return driver.command_profile
+    profile = profile or CommandProfile()
+    driver.command_executor = InstrumentedExecutor(driver.command_executor, profile)
+    driver.command_profile = profile
+    return profile
+
+
+# stands for the live server url in recordings, its port differs between runs
+LIVE_SERVER = 'http://live-server'
+SESSION_FILE = 'session.json'
+
+
+def recording_path(directory, test):
+    return os.path.join(directory, '{0}.json'.format(test))
+
+
+class RecordingExecutor(object):
+    """
+    Stands in for a driver's command executor, keeping every command with
+    the browser's response between start() and stop(), which saves them
+    for fakedriver.ReplayExecutor as <directory>/<test id>.json.
+    """
+
+    def __init__(self, executor, directory):
+        self.executor = executor
+        self.directory = directory
+        self.test = None
+        self.base_url = None
+        self.entries = None
+
+    def start(self, test, base_url=None):
+        self.test = test
+        self.base_url = base_url
+        self.entries = []
+
+    def execute(self, command, params):
+        response = self.executor.execute(command, params)
+        if self.entries is not None:
+            params = dict(params or {})
+            params.pop('sessionId', None)
+            # a copy, the driver replaces element references in the response it gets
+            self.entries.append({'command': command, 'params': params,
+                                 'response': json.loads(json.dumps(response))})
+        return response
+
+    def stop(self):
+        if self.entries is None:
+            return
+        text = json.dumps({'test': self.test, 'commands': self.entries}, indent=1, sort_keys=True)
+        if self.base_url:
+            text = text.replace(self.base_url, LIVE_SERVER)
+        with open(recording_path(self.directory, self.test), 'w') as f:
+            f.write(text)
+        self.entries = None
+
+    def __getattr__(self, name):
+        return getattr(self.executor, name)
+
+
+def record(driver, directory):
+    """
+    Record the driver's commands into directory, the recording is
+    controlled through driver.recording. Saves the session the driver
+    opened, a replay has to speak the same protocol dialect. Parallel
+    workers recording into one directory overwrite each other's
+    session.json, the last one wins; that is harmless as long as they all
+    run the same browser, replays ignore the session id.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    if driver.w3c:
+        session = {'value': {'sessionId': driver.session_id, 'capabilities': driver.capabilities}}
+    else:
+        session = {'status': 0, 'sessionId': driver.session_id, 'value': driver.capabilities}
+    with open(os.path.join(directory, SESSION_FILE), 'w') as f:
+        json.dump(session, f, indent=1, sort_keys=True)
+
+    driver.recording = RecordingExecutor(driver.command_executor, directory)
+    driver.command_executor = driver.recording
+    return driver.recording
+
+
+class WaitLedger(object):
+    """
+    Time spent in waits which ran out, by call site. A probe expecting the
+    element to be absent pays its whole timeout every time; the leaderboard
+    shows which of them cost the most.
+    """
+
+    def __init__(self):
+        self.sites = {}
+
+    def record(self, site, duration):
+        entry = self.sites.setdefault(site, {'count': 0, 'time': 0})
+        entry['count'] += 1
+        entry['time'] += duration
+
+    def leaderboard(self, limit=20):
+        return sorted(self.sites.items(), key=lambda item: item[1]['time'], reverse=True)[:limit]
+
+    def format_leaderboard(self, limit=20):
+        lines = ['Wasted waits (expired timeouts by call site):']
+        for site, entry in self.leaderboard(limit):
+            lines.append('{0:9.2f}s {1:6d}x  {2}'.format(entry['time'], entry['count'], site))
+        return '\n'.join(lines)
+
+    def print_leaderboard(self, stream=None, limit=20):
+        if self.sites:
+            (stream or sys.stderr).write(self.format_leaderboard(limit) + '\n')
+
+
+# collected by the wait helpers in elements.py
+wasted_waits = WaitLedger()
+
+
+_report_lock = threading.Lock()
+
+
+def write_report(path, report):
+    # one JSON object per line, parallel workers append to the same file
+    line = json.dumps(report, sort_keys=True) + '\n'
+    with _report_lock:
+        with open(path, 'a') as f:
+            f.write(line)
@@ -1,7 +1,10 @@
 from .elements import (BasePageElement, ToggleElement, EditPopupElement,
         DescriptionEditorElement, XMLEditorElement, EditFormElement, DataWrapper,
-        is_alert_present, is_element_present, is_element_present_until,
-        ajax_timeout)
+        is_alert_present, is_element_present,
+        wait_for_element, data_element, data_locator, scrape_rows, TreeSnapshot,
+        wait_until, alert_present, element_removed, text_changed, ajax_timeout,
+        switch_tab)
+from .instrumentation import command_budget
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import NoSuchElementException
 
@@ -10,6 +13,13 @@ class BasePage(object):
     def __init__(self, driver):
         self.driver = driver
 
+    @property
+    def current_url(self):
+        return self.driver.current_url
+
+    def switch_tab(self, fragment, tabs_selector=''):
+        switch_tab(self.driver, fragment, tabs_selector)
+
 
 class MainPage(BasePage):
     LOGIN_LINK = (By.ID, 'login')
@@ -96,10 +106,7 @@ class FavouritesMenu(BasePage):
 
     @property
     def menu_element(self):
-        if not is_element_present_until(self.driver, self.menu_locator,
-                timeout=1):
-            return None
-        return self.driver.find_element(*self.menu_locator)
+        return wait_for_element(self.driver, self.menu_locator, timeout=1)
 
     def favourite_elements(self):
         return [FavouriteElement(e) for e in self.menu_element.find_elements_by_css_selector('li') if e.get_attribute('data-shortname')]
@@ -135,7 +142,7 @@ class LoginPage(BasePage):
     password_field = LoginPassword()
 
     def path_matches(self):
-        return 'login' in self.driver.current_url
+        return 'login' in self.current_url
 
     def send_user_password(self, username, password):
         self.username_field = username
@@ -279,7 +286,7 @@ class Bugzilla(BasePage):
     bugzilla_product = BugzillaProductForm()
 
     def path_matches(self):
-        return self.driver.current_url.endswith('overview')
+        return self.current_url.endswith('overview')
 
     def create_bugzilla(self, data):
         self.bugzilla_product.open(self.driver)
@@ -320,23 +327,29 @@ class ScheduleLink(BasePage):
     schedule_link = ScheduleLinkForm()
 
     def path_matches(self):
-        return self.driver.current_url.endswith('overview')
+        return self.current_url.endswith('overview')
 
     def create_link(self, path):
         self.schedule_link.open(self.driver)
-        for item in path:
-            self.driver.find_element_by_link_text(item).click()
+        self.select_path(path)
 
-        self.driver.find_element(*self.schedule_link.submit_locator).click()
-        while self.driver.find_element(*self.schedule_link.submit_locator).is_displayed():
-            self.driver.implicitly_wait(1)
+        submit_locator = self.schedule_link.submit_locator
+        self.driver.find_element(*submit_locator).click()
+        wait_until(self.driver, lambda driver: not driver.find_element(*submit_locator).is_displayed())
         return None
 
+    def select_path(self, path):
+        # each level of the schedule tree shows up once its parent is clicked
+        for item in path:
+            element = wait_for_element(self.driver, (By.LINK_TEXT, item), timeout=5)
+            if element is None:
+                raise NoSuchElementException
+            element.click()
+
 
     def edit_link(self, path):
         self.schedule_link.open(self.driver, locator=self.schedule_link.EDIT_SL_FORM)
-        for item in path:
-            self.driver.find_element_by_link_text(item).click()
+        self.select_path(path)
 
         self.schedule_link.submit(self.driver)
         return None
@@ -350,10 +363,10 @@ class ScheduleLink(BasePage):
 
 
     def schedule(self):
-        if is_element_present_until(self.driver, self.schedule_link.SL_VALUE, 3):
-            return self.driver.find_element(*self.schedule_link.SL_VALUE).text
-        else:
+        element = wait_for_element(self.driver, self.schedule_link.SL_VALUE, 3)
+        if element is None:
             raise NoSuchElementException
+        return element.text
 
 
 
@@ -367,7 +380,7 @@ class OverviewTab(BasePage):
     shortname = EditShortName()
 
     def path_matches(self):
-        return self.driver.current_url.endswith('overview')
+        return self.current_url.endswith('overview')
 
     def toggle_cancel(self):
         return self.cancel_toggle.toggle(self.driver)
@@ -424,9 +437,8 @@ class StatusForm(EditFormElement):
     submit_locator = (By.ID, 'formAddNewRowSubmit')
 
     def execute(self, driver, method, *args):
-        if is_element_present_until(driver, self.add_locator, timeout=0.5):
-            element = driver.find_element(*self.add_locator)
-        else:
+        element = wait_for_element(driver, self.add_locator, timeout=0.5)
+        if element is None:
             element = driver.find_element(*self.edit_locator)
 
         element.click()
@@ -461,11 +473,14 @@ class IssueForm(EditFormElement):
 
 
 class StatusTab(BasePage):
+    STATUS_ROWS = "div#status-rep tbody.statuses tr"
+    ISSUE_ROWS = "div#status-rep tbody.issues tr"
+
     status = StatusForm()
     issue_form = IssueForm()
 
     def path_matches(self):
-        return self.driver.current_url.endswith('statusrep#overview')
+        return self.current_url.endswith('statusrep#overview')
 
     def go_to_overview(self):
         from collections import namedtuple
@@ -480,8 +495,7 @@ class StatusTab(BasePage):
         self.go_to_subject(subject=fake_sub)
 
     def go_to_subject(self, subject):
-        script = """$('#subject-tabs [href="#{0}"]').click()""".format(subject.shortname)
-        self.driver.execute_script(script)
+        self.switch_tab(subject.shortname, '#subject-tabs')
 
     def create_issue(self, data):
         self.go_to_issues_risks()
@@ -509,6 +523,7 @@ class StatusTab(BasePage):
         data = self.status.submit(self.driver)
         return data
 
+    @command_budget(9)
     def edit_status(self, row_element, data):
         if type(row_element) in (int, str, unicode):
             row_element = self.status_element(str(row_element))
@@ -539,40 +554,16 @@ class StatusTab(BasePage):
 
 
     def status_element(self, data_id):
-        data_id = str(data_id)
-        element = [e for e in self.status_elements() if e.data_id == data_id]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.STATUS_ROWS, data_id)
 
     def status_elements(self):
-        selector = "div#status-rep tbody.statuses"
-        row_list = []
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            elem = self.driver.find_element_by_css_selector(selector)
-            row_list = elem.find_elements(By.TAG_NAME, 'tr')
-
-        data = [DataWrapper(r) for r in row_list]
-        return data
+        return scrape_rows(self.driver, self.STATUS_ROWS, cells='td', require_id=False)
 
     def issue_element(self, data_id):
-        data_id = str(data_id)
-        element = [e for e in self.issue_elements() if e.data_id == data_id]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.ISSUE_ROWS, data_id)
 
     def issue_elements(self):
-        selector = "div#status-rep tbody.issues"
-        row_list = []
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            elem = self.driver.find_element_by_css_selector(selector)
-            row_list = elem.find_elements(By.TAG_NAME, 'tr')
-
-        data = [DataWrapper(r) for r in row_list]
-        return data
+        return scrape_rows(self.driver, self.ISSUE_ROWS, cells='td', require_id=False)
 
 
 class DocumentForm(EditFormElement):
@@ -612,12 +603,17 @@ class SectionElement(DataWrapper):
 
 
 class DocumentsTab(BasePage):
+    DOCUMENTS_TREE = "div#docs > ul#documents"
+    DOCUMENT_ROWS = "div#docs > ul#documents li.tree-leaf"
+    SECTION_ROWS = "div#docs > ul#documents li.tree-branch"
+
     document_form = DocumentForm()
     section_form = SectionForm()
 
     def path_matches(self):
-        return self.driver.current_url.endswith('docs')
+        return self.current_url.endswith('docs')
 
+    @command_budget(10)
     def create_document(self, data_dict, parent=None):
         if type(parent) in (int, str, unicode):
             parent = self.section_element(str(parent))
@@ -634,6 +630,7 @@ class DocumentsTab(BasePage):
         data = self.document_form.submit(self.driver)
         return data
 
+    @command_budget(9)
     def edit_document(self, row_element, data):
         if type(row_element) in (int, str, unicode):
             row_element = self.document_element(str(row_element))
@@ -654,32 +651,16 @@ class DocumentsTab(BasePage):
         alert.accept()
         ajax_timeout(self.driver)
 
+    def documents_tree(self):
+        return TreeSnapshot(self.driver, self.DOCUMENTS_TREE)
+
     def document_element(self, data_id):
-        data_id = str(data_id)
-        element = [e for e in self.document_elements() if e.data_id == data_id]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.DOCUMENT_ROWS, data_id, DocumentElement)
 
     def document_elements(self, parent=None):
-        selector = "div#docs > ul#documents"
-        row_list = []
-
-        # for parent as a int or str type find his element
-        if type(parent) in (int, str, unicode):
-            #parent = self.document_element(str(parent))
-            parent = self.section_element(str(parent))
-
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            if parent is None:
-                elem = self.driver.find_element_by_css_selector(selector)
-            else:
-                elem = parent
-
-            row_list = elem.find_elements_by_css_selector('li.tree-leaf')
-        return [DocumentElement(r) for r in row_list]
+        return self.documents_tree().descendants(parent, kind='leaf')
 
+    @command_budget(10)
     def create_section(self, data, parent=None):
         if type(parent) in (int, str, unicode):
             parent = self.section_element(str(parent))
@@ -717,28 +698,10 @@ class DocumentsTab(BasePage):
         ajax_timeout(self.driver)
 
     def section_element(self, data_id):
-        data_id = str(data_id)
-        element = [e for e in self.section_elements() if e.data_id == data_id]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.SECTION_ROWS, data_id, SectionElement)
 
     def section_elements(self, parent=None):
-        selector = "div#docs > ul#documents"
-        row_list = []
-        # for parent as a int or str type find his element
-        if type(parent) in (int, str, unicode):
-            parent = self.section_element(str(parent))
-
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            if parent is None:
-                elem = self.driver.find_element_by_css_selector(selector)
-            else:
-                elem = parent
-
-            row_list = elem.find_elements_by_css_selector('li.tree-branch')
-        return [SectionElement(r) for r in row_list]
+        return self.documents_tree().descendants(parent, kind='branch')
 
 
 class PersonForm(EditFormElement):
@@ -746,16 +709,20 @@ class PersonForm(EditFormElement):
     NEW_PERSON_FORM_SUBMIT = (By.ID, 'formAddNewRowSubmit')
 
     fields = ('function', 'description', 'user')
+    # user is an autocomplete input, it reacts on keystrokes only
+    typed_fields = ('user',)
     form_link_locator = NEW_PERSON_FORM
     submit_locator = NEW_PERSON_FORM_SUBMIT
 
 
 
 class PeopleTab(BasePage):
+    PERSON_ROWS = "div#people-tree table > tbody tr"
+
     person_form = PersonForm()
 
     def path_matches(self):
-        return self.driver.current_url.endswith('people')
+        return self.current_url.endswith('people')
 
     def create_person(self, data):
         self.person_form.open(self.driver)
@@ -784,20 +751,10 @@ class PeopleTab(BasePage):
         ajax_timeout(self.driver)
 
     def person_element(self, data_id):
-        element = [e for e in self.person_elements() if e.data_id == str(data_id)]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.PERSON_ROWS, data_id)
 
     def person_elements(self):
-        selector = "div#people-tree table > tbody"
-        row_list = []
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            elem = self.driver.find_element_by_css_selector(selector)
-            row_list = elem.find_elements(By.TAG_NAME, 'tr')
-
-        return [DataWrapper(r) for r in row_list if r.get_attribute("data-id") != None]
+        return scrape_rows(self.driver, self.PERSON_ROWS, cells='td')
 
 
 class MeetingForm(EditFormElement):
@@ -829,12 +786,16 @@ class MailListForm(EditFormElement):
 
 
 class CommsTab(BasePage):
+    MEETING_ROWS = "div#comms > ul#meetings li"
+    IRC_ROWS = "div#comms > ul#ircs li"
+    ML_ROWS = "div#comms > ul#emails li"
+
     meeting_form = MeetingForm()
     irc_form = IRCForm()
     maillist_form = MailListForm()
 
     def path_matches(self):
-        return self.driver.current_url.endswith('comms')
+        return self.current_url.endswith('comms')
 
     def create_meeting(self, data):
         self.meeting_form.open(self.driver)
@@ -863,20 +824,10 @@ class CommsTab(BasePage):
         ajax_timeout(self.driver)
 
     def meeting_element(self, data_id):
-        element = [e for e in self.meeting_elements() if e.data_id == data_id]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.MEETING_ROWS, data_id)
 
     def meeting_elements(self):
-        selector = "div#comms > ul#meetings"
-        row_list = []
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            elem = self.driver.find_element_by_css_selector(selector)
-            row_list = elem.find_elements(By.TAG_NAME, 'li')
-
-        return [DataWrapper(r) for r in row_list if r.get_attribute("data-id") != None]
+        return scrape_rows(self.driver, self.MEETING_ROWS)
 
     def create_irc(self, data):
         self.irc_form.open(self.driver)
@@ -906,20 +857,10 @@ class CommsTab(BasePage):
 
 
     def irc_element(self, data_id):
-        element = [e for e in self.irc_elements() if e.data_id == data_id]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.IRC_ROWS, data_id)
 
     def irc_elements(self):
-        selector = "div#comms > ul#ircs"
-        row_list = []
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            elem = self.driver.find_element_by_css_selector(selector)
-            row_list = elem.find_elements(By.TAG_NAME, 'li')
-
-        return [DataWrapper(r) for r in row_list if r.get_attribute("data-id") != None]
+        return scrape_rows(self.driver, self.IRC_ROWS)
 
 
     def create_ml(self, data):
@@ -949,20 +890,10 @@ class CommsTab(BasePage):
         ajax_timeout(self.driver)
 
     def ml_element(self, data_id):
-        element = [e for e in self.ml_elements() if e.data_id == data_id]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.ML_ROWS, data_id)
 
     def ml_elements(self):
-        selector = "div#comms > ul#emails"
-        row_list = []
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            elem = self.driver.find_element_by_css_selector(selector)
-            row_list = elem.find_elements(By.TAG_NAME, 'li')
-
-        return [DataWrapper(r) for r in row_list if r.get_attribute("data-id") != None]
+        return scrape_rows(self.driver, self.ML_ROWS)
 
 
 class BusinessGroupForm(EditFormElement):
@@ -990,6 +921,10 @@ class BusinessUnitElement(DataWrapper):
 
 
 class AdminBUsPage(BasePage):
+    BUSINESS_UNITS_TREE = "ul#bus-tree"
+    BUSINESS_UNIT_ROWS = "ul#bus-tree .tree-leaf"
+    BUSINESS_GROUP_ROWS = "ul#bus-tree .tree-branch"
+
     business_group_form = BusinessGroupForm()
     business_unit_form = BusinessUnitForm()
 
@@ -1002,7 +937,7 @@ class AdminBUsPage(BasePage):
         return row_element
 
     def path_matches(self):
-        return self.driver.current_url.endswith('/manage-bus/')
+        return self.current_url.endswith('/manage-bus/')
 
     def create_business_unit(self, data_dict, parent=None):
         if type(parent) in (int, str, unicode):
@@ -1025,29 +960,15 @@ class AdminBUsPage(BasePage):
         data = self.business_unit_form.submit(self.driver)
         return data
 
+    def business_units_tree(self):
+        return TreeSnapshot(self.driver, self.BUSINESS_UNITS_TREE)
+
     def business_unit_element(self, data_id):
-        element = [e for e in self.business_unit_elements() if e.data_id == data_id]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.BUSINESS_UNIT_ROWS, data_id, BusinessUnitElement)
 
     def business_unit_elements(self, parent=None):
-        selector = "ul#bus-tree"
-        row_list = []
-
-        if type(parent) in (int, str, unicode):
-            parent = self.business_group_element(str(parent))
-
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            if parent is None:
-                elem = self.driver.find_element_by_css_selector(selector)
-            else:
-                elem = parent
-
-            row_list = elem.find_elements(By.CLASS_NAME, 'tree-leaf')
-
-        return [BusinessUnitElement(r) for r in row_list if r.get_attribute('data-id') != None]
+        nodes = self.business_units_tree().descendants(parent, kind='leaf')
+        return [n for n in nodes if n.data_id is not None]
 
     def remove_business_unit(self, element_id):
         row_element = self.get_element(element_id)
@@ -1074,20 +995,11 @@ class AdminBUsPage(BasePage):
         return data
 
     def business_group_element(self, data_id):
-        element = [e for e in self.business_group_elements() if e.data_id == data_id]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.BUSINESS_GROUP_ROWS, data_id)
 
     def business_group_elements(self):
-        selector = "ul#bus-tree"
-        row_list = []
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            elem = self.driver.find_element_by_css_selector(selector)
-            row_list = elem.find_elements(By.CLASS_NAME, 'tree-branch')
-
-        return [DataWrapper(r) for r in row_list if r.get_attribute('data-id') != None]
+        nodes = self.business_units_tree().descendants(kind='branch')
+        return [n for n in nodes if n.data_id is not None]
 
     def remove_business_group(self, row_element):
         if type(row_element) in (int, str, unicode):
@@ -1116,11 +1028,13 @@ class StatusSubjectToggleButton(ToggleElement):
 
 
 class AdminStatusSubjectsPage(BasePage):
+    STATUS_SUBJECT_ROWS = "div#items-tree li"
+
     status_toggle = StatusSubjectToggleButton()
     status_subjects_form = StatusSubjectForm()
 
     def path_matches(self):
-        return self.driver.current_url.endswith('/status_subjects/')
+        return self.current_url.endswith('/status_subjects/')
 
     def get_element(self, element_id):
         if type(element_id) in (int, str, unicode):
@@ -1130,20 +1044,10 @@ class AdminStatusSubjectsPage(BasePage):
         return row_element
 
     def status_subjects_element(self, data_id):
-        element = [e for e in self.status_subjects_elements() if e.data_id == data_id]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.STATUS_SUBJECT_ROWS, data_id)
 
     def status_subjects_elements(self):
-        selector = "div#items-tree"
-        row_list = []
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            elem = self.driver.find_element(By.CSS_SELECTOR, selector)
-            row_list = elem.find_elements(By.TAG_NAME, 'li')
-
-        return [DataWrapper(r) for r in row_list if r.get_attribute('data-id') != None]
+        return scrape_rows(self.driver, self.STATUS_SUBJECT_ROWS)
 
     def create_status_subject(self, data_dict):
         self.status_subjects_form.open(self.driver)
@@ -1160,25 +1064,27 @@ class AdminStatusSubjectsPage(BasePage):
         return data
 
     def remove_status_subject(self, row_element):
+        row_element = self.get_element(row_element)
+        locator = data_locator(self.STATUS_SUBJECT_ROWS, row_element.data_id)
         selector = 'button.btn-delete'
-        self.get_element(row_element).find_element_by_css_selector(selector).click()
-        while not is_alert_present(self.driver):
-            is_element_present_until(self.driver, (By.ID, 'fake_element'), 5)
+        row_element.find_element_by_css_selector(selector).click()
 
-        alert = self.driver.switch_to.alert
+        alert = wait_until(self.driver, alert_present(), 10, 'No confirmation alert')
         alert.accept()
-        is_element_present_until(self.driver, (By.ID, 'fake_element'), 5)
+        wait_until(self.driver, element_removed(locator), 10, 'Status subject was not removed')
 
     def toggle_status_subject(self, element_id):
         """
         Hide or show status subject
         """
         row_element = self.get_element(element_id)
-        self.status_toggle.toggle(row_element)
         selector = self.status_toggle.HIDE_SHOW_TOGGLE_VALUE
-        # it takes more time so we will slower test
-        is_element_present_until(self.driver, (By.ID, 'fake_element'), 5)
-        return self.get_element(element_id).find_element(*selector).text.lower()
+        locator = data_locator(self.STATUS_SUBJECT_ROWS, row_element.data_id)
+        text = row_element.find_element(*selector).text
+
+        self.status_toggle.toggle(row_element)
+        return wait_until(self.driver, text_changed(locator, text, child=selector), 10,
+                'Status subject was not toggled').lower()
 
 
 class AdminPersonForm(EditFormElement):
@@ -1191,10 +1097,12 @@ class AdminPersonForm(EditFormElement):
 
 
 class AdminPeopleManagementPage(BasePage):
+    ITEM_ROWS = "div#items-tree > ul li"
+
     person_form = AdminPersonForm()
 
     def path_matches(self):
-        return self.driver.current_url.endswith('persons')
+        return self.current_url.endswith('persons')
 
     def get_element(self, element_id):
         if type(element_id) in (int, str, unicode):
@@ -1211,20 +1119,10 @@ class AdminPeopleManagementPage(BasePage):
 
 
     def admin_person_elements(self):
-        selector = "div#items-tree > ul"
-        row_list = []
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            elem = self.driver.find_element_by_css_selector(selector)
-            row_list = elem.find_elements(By.TAG_NAME, 'li')
-
-        return [DataWrapper(r) for r in row_list if r.get_attribute('data-id') != None]
+        return scrape_rows(self.driver, self.ITEM_ROWS)
 
     def admin_person_element(self, data_id):
-        element = [e for e in self.admin_person_elements() if e.data_id == data_id]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.ITEM_ROWS, data_id)
 
     def edit_admin_person(self, row_element, data):
         row_element = self.get_element(row_element)
@@ -1253,10 +1151,12 @@ class AdminDescriptionForm(EditFormElement):
 
 
 class AdminPeopleDescriptionManagementPage(BasePage):
+    ITEM_ROWS = "div#items-tree > ul li"
+
     description_form = AdminDescriptionForm()
 
     def path_matches(self):
-        return self.driver.current_url.endswith('descriptions')
+        return self.current_url.endswith('descriptions')
 
     def get_element(self, element_id):
         if type(element_id) in (int, str, unicode):
@@ -1272,20 +1172,10 @@ class AdminPeopleDescriptionManagementPage(BasePage):
         return data
 
     def admin_description_elements(self):
-        selector = "div#items-tree > ul"
-        row_list = []
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            elem = self.driver.find_element_by_css_selector(selector)
-            row_list = elem.find_elements(By.TAG_NAME, 'li')
-
-        return [DataWrapper(r) for r in row_list if r.get_attribute('data-id') != None]
+        return scrape_rows(self.driver, self.ITEM_ROWS)
 
     def admin_description_element(self, data_id):
-        element = [e for e in self.admin_description_elements() if e.data_id == data_id]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.ITEM_ROWS, data_id)
 
     def edit_admin_description(self, row_element, data):
         row_element = self.get_element(row_element)
@@ -1314,10 +1204,12 @@ class AdminFunctionForm(EditFormElement):
 
 
 class AdminPeopleFunctionManagementPage(BasePage):
+    ITEM_ROWS = "div#items-tree > ul li"
+
     function_form = AdminFunctionForm()
 
     def path_matches(self):
-        return self.driver.current_url.endswith('fuctions')
+        return self.current_url.endswith('fuctions')
 
     def get_element(self, element_id):
         if type(element_id) in (int, str, unicode):
@@ -1333,20 +1225,10 @@ class AdminPeopleFunctionManagementPage(BasePage):
         return data
 
     def admin_function_elements(self):
-        selector = "div#items-tree > ul"
-        row_list = []
-        if is_element_present(self.driver, By.CSS_SELECTOR, selector):
-            elem = self.driver.find_element_by_css_selector(selector)
-            row_list = elem.find_elements(By.TAG_NAME, 'li')
-
-        return [DataWrapper(r) for r in row_list if r.get_attribute('data-id') != None]
+        return scrape_rows(self.driver, self.ITEM_ROWS)
 
     def admin_function_element(self, data_id):
-        element = [e for e in self.admin_function_elements() if e.data_id == data_id]
-        if element:
-            return element[0]
-        else:
-            raise NoSuchElementException
+        return data_element(self.driver, self.ITEM_ROWS, data_id)
 
     def edit_admin_function(self, row_element, data):
         row_element = self.get_element(row_element)
@@ -1403,7 +1285,7 @@ class SecurityPage(BasePage):
     cpe_input = CPEInput()
 
     def path_matches(self):
-        return 'security' in self.driver.current_url
+        return 'security' in self.current_url
 
     def add_editor_text(self, text):
         self.xml_editor.send_keys(self.driver, text)
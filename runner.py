@@ -0,0 +1,68 @@
+import os
+import unittest
+
+from django.test import runner as django_runner
+from django.test.runner import DiscoverRunner, ParallelTestSuite
+
+
+# first live server port, worker N listens on LIVE_SERVER_BASE_PORT + N
+LIVE_SERVER_BASE_PORT = int(os.environ.get('SELENIUM_LIVE_SERVER_BASE_PORT', 8081))
+
+
+# private hooks of Django's parallel runner: _init_worker, _worker_id and
+# ParallelTestSuite.init_worker, checked against Django 1.9 to 4.2; 4.1 added
+# arguments to _init_worker, they are passed through
+def init_selenium_worker(counter, *args):
+    # Django switches the worker to its own clone of the test database here
+    django_runner._init_worker(counter, *args)
+
+    # own live server per worker; Django >= 1.11 picks a free port by itself
+    port = LIVE_SERVER_BASE_PORT + django_runner._worker_id
+    os.environ['DJANGO_LIVE_TEST_SERVER_ADDRESS'] = 'localhost:{0}'.format(port)
+
+
+def flatten_suite(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            for t in flatten_suite(test):
+                yield t
+        else:
+            yield test
+
+
+def partition_suite_by_method(suite, shards):
+    """
+    Deal test methods round robin into shards. Methods of one class stay
+    next to each other inside a shard, so setUpClass runs once per shard.
+    """
+    subsuites = [unittest.TestSuite() for i in range(shards)]
+    for i, test in enumerate(flatten_suite(suite)):
+        subsuites[i % shards].addTest(test)
+    return [s for s in subsuites if s.countTestCases()]
+
+
+class MethodParallelTestSuite(ParallelTestSuite):
+    init_worker = init_selenium_worker
+
+    def __init__(self, suite, processes, *args, **kwargs):
+        super(MethodParallelTestSuite, self).__init__(suite, processes, *args, **kwargs)
+        self.subsuites = partition_suite_by_method(suite, processes)
+
+
+class ParallelSeleniumRunner(DiscoverRunner):
+    """
+    Runs the selenium suite sharded by test method across worker processes.
+    Each worker gets its own test database clone (Django's parallel runner),
+    its own live server port and its own browsers from its BrowserPool;
+    results are merged by Django.
+
+        TEST_RUNNER = '<package>.runner.ParallelSeleniumRunner'
+        SELENIUM_WORKERS=4 ./manage.py test <package>
+
+    or pass --parallel N to the test command.
+    """
+    parallel_test_suite = MethodParallelTestSuite
+
+    def __init__(self, parallel=0, **kwargs):
+        parallel = parallel or int(os.environ.get('SELENIUM_WORKERS', 1))
+        super(ParallelSeleniumRunner, self).__init__(parallel=parallel, **kwargs)
@@ -1,47 +1,170 @@
+import copy
+import hashlib
+import json
 import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from unittest import skip, skipIf, SkipTest, TestSuite, defaultTestLoader
+from importlib import import_module
+from multiprocessing.util import Finalize
 from urlparse import urlparse, urljoin
 
+from django.apps import apps
 from django.conf import settings
-from django.test import LiveServerTestCase
+from django.core import serializers
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Model
+from django.test import LiveServerTestCase, SimpleTestCase
 from django.test.utils import override_settings
-from django.contrib.auth import get_user_model
+from django.utils import six
+from django.contrib.auth import (get_user_model, SESSION_KEY, BACKEND_SESSION_KEY,
+        HASH_SESSION_KEY)
 User = get_user_model()
 
-from selenium import webdriver
 from selenium.webdriver.firefox.webdriver import WebDriver
+from selenium.webdriver.firefox.firefox_binary import FirefoxBinary
+from selenium.webdriver.firefox.options import Options as FirefoxOptions
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.by import By
 
-from selenium.common.exceptions import NoSuchElementException, NoAlertPresentException,\
-    TimeoutException
+from selenium.common.exceptions import NoAlertPresentException, WebDriverException
 
 from pp.base.tests import TestData
 from pp.base.models import BU, Product, Release
-from pp.people.models import Function
-
+from pp.people.models import Function, Person
+from pp.docs.models import Document, Section
+from pp.comms.models import Meeting
+from pp.bugzilla.models import BugzillaProduct
+
+from .elements import (setup_driver, set_script_timeout, NETWORK_IDLE_TIMEOUT,
+        is_element_present, is_element_present_until, is_alert_present,
+        install_network_tracker, scrape_rows,
+        TreeSnapshot, FILL_FORM_SCRIPT, FORM_VALUES_SCRIPT)
+from .fakedriver import (fake_driver, StubExecutor, DomExecutor, ReplayExecutor,
+        ReplayMismatch, lxml_html)
+from .instrumentation import record, write_report, wasted_waits
 from .page import (MainPage, SideMenu, LoginPage, OverviewTab,
         DocumentsTab, PeopleTab, CommsTab, FavouritesMenu, Bugzilla,
-        ScheduleLink, StatusTab, AdminStatusSubjectsPage, SecurityPage)
+        ScheduleLink, StatusTab, AdminStatusSubjectsPage, SecurityPage,
+        DocumentForm)
+from .runner import partition_suite_by_method
 
 
 logger = logging.getLogger(__name__)
 
 
+# preferences tuned for automation, written once into the profile template
+AUTOMATION_PREFERENCES = {
+    'app.update.enabled': False,
+    'app.update.auto': False,
+    'extensions.update.enabled': False,
+    'browser.shell.checkDefaultBrowser': False,
+    'browser.startup.page': 0,
+    'browser.startup.homepage': 'about:blank',
+    'browser.startup.homepage_override.mstone': 'ignore',
+    'startup.homepage_welcome_url': 'about:blank',
+    'startup.homepage_welcome_url.additional': '',
+    'browser.rights.3.shown': True,
+    'toolkit.telemetry.enabled': False,
+    'toolkit.telemetry.reportingpolicy.firstRun': False,
+    'datareporting.healthreport.uploadEnabled': False,
+    'datareporting.policy.dataSubmissionEnabled': False,
+    'toolkit.cosmeticAnimations.enabled': False,
+    'ui.prefersReducedMotion': 1,
+    'browser.tabs.animate': False,
+    'browser.fullscreen.animate': False,
+    'browser.download.animateNotifications': False,
+}
+
+PROFILE_CACHE_DIR = os.environ.get('SELENIUM_PROFILE_CACHE',
+        os.path.join(tempfile.gettempdir(), 'pp-selenium-profiles'))
+
+
+_firefox_version = []
+
+
+def get_firefox_version():
+    # asked once per process, part of the profile template's cache key
+    if not _firefox_version:
+        try:
+            version = subprocess.check_output([FirefoxBinary()._start_cmd, '--version']).strip()
+        except (OSError, subprocess.CalledProcessError, WebDriverException):
+            version = ''
+        _firefox_version.append(version)
+    return _firefox_version[0]
+
+
+def get_profile_template():
+    """
+    Directory of the prebuilt Firefox profile. It is created on first use
+    and rebuilt when AUTOMATION_PREFERENCES or the Firefox version change.
+    """
+    key = json.dumps([AUTOMATION_PREFERENCES, repr(get_firefox_version())], sort_keys=True)
+    template = os.path.join(PROFILE_CACHE_DIR, hashlib.md5(key.encode('utf-8')).hexdigest())
+    if os.path.isdir(template):
+        return template
+
+    if not os.path.isdir(PROFILE_CACHE_DIR):
+        os.makedirs(PROFILE_CACHE_DIR)
+    build_dir = tempfile.mkdtemp(dir=PROFILE_CACHE_DIR)
+    with open(os.path.join(build_dir, 'user.js'), 'w') as userjs:
+        for name, value in sorted(AUTOMATION_PREFERENCES.items()):
+            userjs.write('user_pref("{0}", {1});\n'.format(name, json.dumps(value)))
+
+    # let Firefox create its databases once, so browsers start from a used profile
+    options = FirefoxOptions()
+    options.add_argument('-headless')
+    options.add_argument('-profile')
+    options.add_argument(build_dir)
+    try:
+        WebDriver(firefox_options=options).quit()
+    except Exception as e:
+        # never cache a half built profile
+        logger.warning('Unable to initialize profile template:\n%s' % e)
+        shutil.rmtree(build_dir, ignore_errors=True)
+        raise
+
+    try:
+        os.rename(build_dir, template)
+    except OSError:
+        # another worker was faster
+        shutil.rmtree(build_dir, ignore_errors=True)
+    return template
+
+
 def get_firefox_profile():
-    fp = webdriver.FirefoxProfile()
-#    try:
-#        fp.add_extension(extension='firebug.xpi')
-#        # Avoid startup screen
-#        fp.set_preference("extensions.firebug.currentVersion", "2.0.9")
-#        fp.set_preference("extensions.firebug.console.enableSites", "true")
-#        fp.set_preference("extensions.firebug.net.enableSites", "true")
-#        fp.set_preference("extensions.firebug.script.enableSites", "true")
-#        fp.set_preference("extensions.firebug.allPagesActivation", "on")
-#    except Exception as e:
-#        logger.info('Unable to load Firebug:\n%s' % e)
-
-    fp.update_preferences()
-    return fp
+    """
+    Fresh copy of the profile template for one browser, removed again
+    by FirefoxWebDriver.quit.
+    """
+    profile_dir = os.path.join(tempfile.mkdtemp(prefix='pp-selenium-'), 'profile')
+    shutil.copytree(get_profile_template(), profile_dir)
+    return profile_dir
+
+def selenium_setting(name, default=None):
+    # Django settings win over the environment
+    return getattr(settings, name, os.environ.get(name, default))
+
+
+def is_headless():
+    return str(selenium_setting('SELENIUM_HEADLESS', False)).lower() in ('1', 'true', 'yes')
+
+
+def get_timing_report_path():
+    # JSON lines file receiving a command timing report per test, off when unset
+    return selenium_setting('SELENIUM_TIMING_REPORT')
+
+
+def get_window_size():
+    # "WIDTHxHEIGHT", the viewport tests need to run properly
+    width, height = str(selenium_setting('SELENIUM_WINDOW_SIZE', '1000x1024')).lower().split('x')
+    return int(width), int(height)
+
 
 def get_firefox_proxy(host, port):
     from selenium.webdriver.common.proxy import Proxy, ProxyType
@@ -61,32 +184,389 @@ def get_firefox_proxy(host, port):
 
 
 class FirefoxWebDriver(WebDriver):
-    pass
+    profile_dir = None
+
+    def quit(self):
+        try:
+            super(FirefoxWebDriver, self).quit()
+        finally:
+            if self.profile_dir:
+                shutil.rmtree(os.path.dirname(self.profile_dir), ignore_errors=True)
+
+
+def launch_firefox():
+    # the profile is used in place instead of being zipped and sent to the driver
+    profile_dir = get_firefox_profile()
+    options = FirefoxOptions()
+    options.add_argument('-profile')
+    options.add_argument(profile_dir)
+    # window gets its size at launch, there is nothing to check or resize later
+    width, height = get_window_size()
+    options.add_argument('-width')
+    options.add_argument(str(width))
+    options.add_argument('-height')
+    options.add_argument(str(height))
+    if is_headless():
+        options.add_argument('-headless')
+    proxy_spec = get_firefox_proxy('127.0.0.1', 8080)
+    driver = FirefoxWebDriver(firefox_options=options, proxy=proxy_spec)
+    driver.profile_dir = profile_dir
+    #driver = webdriver.Chrome()
+    return driver
+
+
+def get_replay_dir():
+    # recordings made with SELENIUM_RECORD, replayed by the replayable tests
+    return selenium_setting('SELENIUM_REPLAY')
+
+
+def replayable(test):
+    # marks a test method, or a whole SeleniumTestCase, that passes against a recording
+    test.replayable = True
+    return test
+
+
+def create_driver(replay=False):
+    logger.info('Setup Driver')
+
+    record_dir = selenium_setting('SELENIUM_RECORD')
+    if replay:
+        # responses recorded with SELENIUM_RECORD stand in for the browser
+        recording = ReplayExecutor(get_replay_dir())
+        driver = fake_driver(recording)
+        driver.recording = recording
+    else:
+        driver = launch_firefox()
+        if record_dir:
+            # each worker of a parallel run writes its own session.json over the others
+            record(driver, record_dir)
+        # the same setup as fake_driver, command budgets hold for both
+        setup_driver(driver)
+    # sessions created by login_with_cookie, kept for the browser's lifetime
+    driver.auth_sessions = {}
+    driver.auth_cookie = None
+    return driver
+
+
+def reset_browser(driver):
+    """
+    Bring the browser back to a clean state: no alert, no cookies or web
+    storage of the tested site, about:blank loaded. Takes milliseconds
+    compared to starting a new browser.
+    """
+    if is_alert_present(driver):
+        driver.switch_to.alert.dismiss()
+    # storage is per origin, clear it before leaving the site
+    driver.execute_script("""
+        try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}
+    """)
+    driver.delete_all_cookies()
+    driver.auth_cookie = None
+    # a page object may have raised it, the next test records the default again
+    set_script_timeout(driver, NETWORK_IDLE_TIMEOUT)
+    driver.get('about:blank')
+    driver.navigation.forget()
+
+
+class BrowserPool(object):
+    """
+    Browsers shared by the test classes of the whole process. A class
+    borrows one in setUpClass and gives it back in tearDownClass, where
+    its state is reset for the next borrower. Browsers are quit when the
+    process exits.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.browsers = []
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+
+        driver = self.factory()
+        with self.lock:
+            if not self.browsers:
+                # unlike atexit, finalizers run in multiprocessing workers too
+                Finalize(self, self.quit_all, exitpriority=10)
+            self.browsers.append(driver)
+        return driver
+
+    def release(self, driver):
+        try:
+            self.reset(driver)
+        except WebDriverException as e:
+            logger.warning('Unable to reset browser, quitting it:\n%s' % e)
+            self.discard(driver)
+            return
+
+        with self.lock:
+            self.idle.append(driver)
+
+    def reset(self, driver):
+        width, height = get_window_size()
+        driver.set_window_size(width=width, height=height)
+        reset_browser(driver)
+
+    def discard(self, driver):
+        with self.lock:
+            if driver in self.browsers:
+                self.browsers.remove(driver)
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def quit_all(self):
+        with self.lock:
+            browsers, self.browsers, self.idle = self.browsers, [], []
+        for driver in browsers:
+            try:
+                driver.quit()
+            except WebDriverException:
+                pass
+
+
+browser_pool = BrowserPool(create_driver)
+replay_pool = BrowserPool(lambda: create_driver(replay=True))
+
+# leaderboard of expired waits at the end of the run, printed by each worker process
+Finalize(wasted_waits, wasted_waits.print_leaderboard, exitpriority=5)
+
+
+class BackgroundTask(object):
+    """
+    Runs target on a thread right away; join() hands over its result or
+    re-raises its exception.
+    """
+
+    def __init__(self, target, *args):
+        self.result = None
+        self.error = None
+        self.thread = threading.Thread(target=self._run, args=(target,) + args)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self, target, *args):
+        try:
+            self.result = target(*args)
+        except Exception:
+            # with the traceback, it is re-raised on the joining thread
+            self.error = sys.exc_info()
+
+    def join(self):
+        self.thread.join()
+        if self.error is not None:
+            six.reraise(*self.error)
+        return self.result
+
+
+class PrewarmedBrowser(object):
+    """
+    Test case attribute giving the class's browser once it finished
+    starting in the background, launched during setUpClass. Nothing waits
+    for it before the test first uses it, usually after setUp built the
+    fixtures; that first use starts the test's command profile.
+    """
+
+    def __get__(self, obj, owner):
+        driver = owner._browser_task.join()
+        if obj is not None and not obj._browser_used:
+            obj._browser_used = True
+            obj.start_commands(driver)
+        return driver
+
+
+class Preconditions(object):
+    """
+    Creates the state a test needs straight through the ORM, so only the
+    feature under test is driven through the browser:
+
+        section = self.given.section(self.release, 'Specs')
+        self.given.document(self.release, 'Plan', 'www.example.com', section=section)
+        self.given(Function, name='func', email='func@example.com')
+
+    Create preconditions before opening the page which should show them.
+    """
+
+    def __call__(self, model, **fields):
+        return model.objects.create(**fields)
+
+    def section(self, owner, name, parent=None):
+        return self(Section, content_object=owner, name=name, parent=parent)
+
+    def document(self, owner, name, url, section=None):
+        return self(Document, content_object=owner, name=name, url=url, section=section)
+
+    def person(self, owner, function, user, description=''):
+        if isinstance(user, basestring):
+            user, _ = User.objects.get_or_create(**{User.USERNAME_FIELD: user})
+        return self(Person, content_object=owner, function=function, user=user,
+                    description=description)
+
+    def meeting(self, owner, title, **fields):
+        # fields as on the meeting form: day, time, duration, confcode, minutes_url...
+        return self(Meeting, content_object=owner, title=title, **fields)
+
+    def bugzilla_link(self, release, product, version='', nvr=''):
+        return self(BugzillaProduct, release=release, product=product, version=version, nvr=nvr)
+
+
+class FixtureSnapshot(object):
+    """
+    The rows a test case's setUpTestData adds, taken once per class in a
+    transaction which is rolled back, and loaded back before each test:
+
+        snapshot = FixtureSnapshot.take(cls)
+        snapshot.restore(test)
+
+    Loading serialized rows replaces building the object graph through the
+    ORM, the flush after each test stays Django's. Only rows which were not
+    in the database before are kept (content types and permissions come
+    back with the flush), changes to older rows are lost. Model instances
+    setUpTestData leaves on the class are copied to every test, which can
+    change its copies freely. Default database only.
+    """
+
+    def __init__(self, models, data, attributes, using=DEFAULT_DB_ALIAS):
+        self.models = models
+        self.data = data
+        self.attributes = attributes
+        self.using = using
+
+    @classmethod
+    def take(cls, test_case, using=DEFAULT_DB_ALIAS):
+        models = [m for m in apps.get_models() if m._meta.managed and not m._meta.proxy]
+        attributes = dict(test_case.__dict__)
+        with transaction.atomic(using=using):
+            existing = dict((m, set(m._base_manager.using(using).values_list('pk', flat=True)))
+                            for m in models)
+            test_case.setUpTestData()
+
+            added = {}
+            for model in models:
+                rows = [row for row in model._base_manager.using(using).order_by('pk')
+                        if row.pk not in existing[model]]
+                if rows:
+                    added[model] = rows
+            # models with natural keys first, their rows are looked up by the others
+            models = serializers.sort_dependencies(
+                [(model._meta.app_config, [model]) for model in added])
+            data = serializers.serialize('json', (row for model in models for row in added[model]),
+                                         use_natural_foreign_keys=True)
+            transaction.set_rollback(True, using=using)
+
+        attributes = dict((name, value) for name, value in test_case.__dict__.items()
+                          if isinstance(value, Model) and attributes.get(name) is not value)
+        return cls(models, data, attributes, using)
+
+    def restore(self, test):
+        connection = connections[self.using]
+        with transaction.atomic(using=self.using):
+            # like loaddata: rows may refer to rows loaded after them
+            with connection.constraint_checks_disabled():
+                for obj in serializers.deserialize('json', self.data, using=self.using):
+                    obj.save(using=self.using)
+            connection.check_constraints(table_names=[m._meta.db_table for m in self.models])
+
+        # primary keys were given, the sequences have to continue after them
+        statements = connection.ops.sequence_reset_sql(no_style(), self.models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+        for name, value in self.attributes.items():
+            setattr(test, name, copy.deepcopy(value))
 
 
 class SeleniumTestCase(LiveServerTestCase):
+    """
+    Subclasses may build fixture data shared by their tests in a
+    setUpTestData classmethod, see FixtureSnapshot.
+    """
+    # log in by injecting a server side session cookie instead of the login form
+    cookie_login = True
+    # with SELENIUM_REPLAY set, replayable tests (the whole class, or methods marked
+    # with @replayable) run against the recorded browser responses and the others
+    # are skipped. No request reaches the live server, so a replayable test checks
+    # nothing but what the page objects return, and sends no primary key assigned
+    # by the ORM: sequences are not reset between tests, the keys depend on which
+    # tests ran before. That leaves out test_overview, which reads the database,
+    # and the tests passing the pk of a self.given object to the page objects.
+    replayable = False
+
+    wd = PrewarmedBrowser()
+    _browser_used = False
+    _fixture_snapshot = None
+
     @classmethod
     def setUpClass(cls):
-        logger.info('Setup Driver')
-
-        fp = get_firefox_profile()
-        proxy_spec = get_firefox_proxy('127.0.0.1', 8080)
-        cls.wd = FirefoxWebDriver(firefox_profile=fp, proxy=proxy_spec)
-        #cls.wd = webdriver.Chrome()
-        cls.wd.implicitly_wait(5) # seconds
+        if get_replay_dir():
+            if not any(cls._is_replayable(name)
+                       for name in defaultTestLoader.getTestCaseNames(cls)):
+                raise SkipTest('the server is not reached when replaying')
+            cls._browser_pool = replay_pool
+        else:
+            cls._browser_pool = browser_pool
+        # browser starts while the live server is set up and setUp builds the fixtures
+        cls._browser_task = BackgroundTask(cls._browser_pool.acquire)
+        try:
+            super(SeleniumTestCase, cls).setUpClass()
+            if hasattr(cls, 'setUpTestData'):
+                cls._fixture_snapshot = FixtureSnapshot.take(cls)
+        except Exception:
+            # tearDownClass is not called, give the browser back here
+            cls._browser_pool.release(cls._browser_task.join())
+            raise
 
-        # check window size to run tests properly
-        window_size = cls.wd.get_window_size()
-        if window_size['height'] < 1024 or window_size['width'] < 1000:
-            logger.error('Indicated small window size. Needed resize to run tests properly')
-            cls.wd.set_window_size(height=1024, width=1000)
-        super(SeleniumTestCase, cls).setUpClass()
+    @classmethod
+    def _is_replayable(cls, name):
+        return getattr(getattr(cls, name), 'replayable', cls.replayable)
+
+    def __call__(self, result=None):
+        if get_replay_dir() and not self._is_replayable(self._testMethodName):
+            # skipped before _pre_setup, which would flush and build the fixtures
+            setattr(self, self._testMethodName,
+                    skip('the server is not reached when replaying')(
+                        getattr(self, self._testMethodName)))
+        return super(SeleniumTestCase, self).__call__(result)
+
+    def _fixture_setup(self):
+        super(SeleniumTestCase, self)._fixture_setup()
+        if self._fixture_snapshot is not None:
+            self._fixture_snapshot.restore(self)
 
     @classmethod
     def tearDownClass(cls):
-        cls.wd.quit()
+        cls._browser_pool.release(cls._browser_task.join())
         super(SeleniumTestCase, cls).tearDownClass()
 
+    def _pre_setup(self):
+        super(SeleniumTestCase, self)._pre_setup()
+        self.given = Preconditions()
+        self._browser_used = False
+
+    def start_commands(self, driver):
+        # called by self.wd on the test's first use of the browser
+        driver.command_profile.start(self.id())
+        if getattr(driver, 'recording', None) is not None:
+            driver.recording.start(self.id(), self.live_server_url)
+
+    def tearDown(self):
+        if self._browser_used:
+            report = self.wd.command_profile.finish()
+            if get_timing_report_path():
+                write_report(get_timing_report_path(), report)
+            # every test starts from a clean browser, without restarting it
+            reset_browser(self.wd)
+            if getattr(self.wd, 'recording', None) is not None:
+                self.wd.recording.stop()
+        super(SeleniumTestCase, self).tearDown()
+
     def login(self, username, password):
         self.open(settings.LOGIN_URL)
         main_page = MainPage(self.wd)
@@ -97,8 +577,50 @@ class SeleniumTestCase(LiveServerTestCase):
         login_page.send_user_password(username, password)
         login_page.click_submit_login()
 
+    def login_with_cookie(self, username):
+        user = User.objects.get(**{User.USERNAME_FIELD: username})
+        engine = import_module(settings.SESSION_ENGINE)
+        auth = (user._meta.pk.value_to_string(user), user.get_session_auth_hash())
+
+        # reuse the cached session while it exists and belongs to this very user,
+        # the database is flushed and users recreated between tests
+        session_key, session_auth = self.wd.auth_sessions.get(username, (None, None))
+        if session_auth != auth or not engine.SessionStore().exists(session_key):
+            session = engine.SessionStore()
+            session[SESSION_KEY] = auth[0]
+            session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+            session[HASH_SESSION_KEY] = auth[1]
+            session.save()
+            session_key = session.session_key
+            self.wd.auth_sessions[username] = (session_key, auth)
+
+        if self.wd.auth_cookie == session_key:
+            return
+
+        # cookies can be set only for the domain the browser is on
+        if not self.wd.current_url.startswith(self.live_server_url):
+            self.open(self.landing_path())
+        self.wd.add_cookie({'name': settings.SESSION_COOKIE_NAME,
+                            'value': session_key,
+                            'path': '/'})
+        self.wd.auth_cookie = session_key
+
+    def landing_path(self):
+        # only the domain matters, cookies can be set once a page of the live server is
+        # loaded; whatever this returns (usually a 404) is never looked at
+        static_url = getattr(settings, 'STATIC_URL', None) or '/'
+        return static_url if static_url.startswith('/') else '/'
+
     def with_login_get(self, username, password, path):
-        self.login(username, password)
+        # skip logins the browser has already done
+        navigation = self.wd.navigation
+        if navigation.user != username:
+            if self.cookie_login:
+                self.login_with_cookie(username)
+            else:
+                self.login(username, password)
+            navigation.user = username
+
         self.open(path)
 
     def go_to(self, model_object, section=None):
@@ -126,9 +648,15 @@ class SeleniumTestCase(LiveServerTestCase):
 
     def logout(self):
         self.open(settings.LOGOUT_URL)
+        self.wd.auth_cookie = None
+        self.wd.navigation.user = None
+
+    def url(self, path):
+        return "{url}{path}".format(url=self.live_server_url, path=path)
 
     def open(self, path):
-        self.wd.get("{url}{path}".format(url=self.live_server_url, path=path))
+        self.wd.get(self.url(path))
+        install_network_tracker(self.wd)
 
     # obsolete
     def wait_for_spin(self):
@@ -143,18 +671,10 @@ class SeleniumTestCase(LiveServerTestCase):
 
 
     def is_element_present(self, by_obj, what):
-        try:
-            self.wd.find_element(by=by_obj, value=what)
-        except NoSuchElementException:
-            return False
-        return True
+        return is_element_present(self.wd, by_obj, what)
 
     def is_element_present_until(self, by_obj, what, timeout=0):
-        try:
-            waiter = WebDriverWait(self.wd, timeout).until(lambda driver : driver.find_element(by=by_obj, value=what))
-            return waiter.is_displayed()
-        except TimeoutException:
-            return False
+        return is_element_present_until(self.wd, (by_obj, what), timeout)
 
     def is_alert_present(self):
         try:
@@ -177,21 +697,24 @@ class SeleniumTestCase(LiveServerTestCase):
 
 @override_settings(PP_FE_URL='http://127.0.0.1/')
 class ProductTest(SeleniumTestCase):
-    def setUp(self):
+    @classmethod
+    def setUpTestData(cls):
         User.objects.create_superuser(username='admin',
                                       password='admin',
                                       email='pp@pp.xx')
         td = TestData()
-        self.rg = td.create_releasegroup_cloud_spec()
-        self.release = self.rg.releases.all()[0]
-        self.product = self.release.product
-        self.bu = self.product.bu
+        cls.rg = td.create_releasegroup_cloud_spec()
+        cls.release = cls.rg.releases.all()[0]
+        cls.product = cls.release.product
+        cls.bu = cls.product.bu
+
+        cls.function = Function.objects.create(name='func', email='func@example.com')
+        cls.function2 = Function.objects.create(name='func2', email='func2@example.com')
+
+    def setUp(self):
         self.pp_model = self.release.product
         self.model_name = self.pp_model._meta.model_name
 
-        self.function = Function.objects.create(name='func', email='func@example.com')
-        self.function2 = Function.objects.create(name='func2', email='func2@example.com')
-
     def test_overview(self):
         self.go_to(self.pp_model, 'overview')
         tab = OverviewTab(self.wd)
@@ -259,37 +782,18 @@ class ProductTest(SeleniumTestCase):
 
 
     def test_edit_documents_sections(self):
+        section = self.given.section(self.pp_model, 'new section')
+        subsection = self.given.section(self.pp_model, 'subsection', parent=section)
+        self.given.document(self.pp_model, 'test1', 'www.python.org', section=section)
+        document = self.given.document(self.pp_model, 'test2', 'www.python.org',
+                                       section=subsection)
+        sec1_id = str(section.pk)
+        subsec_id = str(subsection.pk)
+        doc2_id = str(document.pk)
+
         self.go_to(self.pp_model, 'docs')
         tab = DocumentsTab(self.wd)
 
-        # create sections
-        data = {'section-name': 'new section'}
-        res = tab.create_section(data)
-        self.assertTrue('_error_msg' not in res)
-
-        sec1_id = tab.section_elements()[0].data_id
-
-        data_sub = {'section-name': 'subsection'}
-        res = tab.create_section(data_sub, parent=sec1_id)
-        self.assertTrue('_error_msg' not in res)
-
-        subsec_id = tab.section_elements(parent=sec1_id)[0].data_id
-
-        # create documents
-        data_doc = {'doc-name': 'test1',
-                    'url': 'www.python.org'}
-        res = tab.create_document(data_doc, parent=sec1_id)
-        self.assertTrue('_error_msg' not in res)
-
-        doc1_id = tab.document_elements()[0].data_id
-
-        data_doc = {'doc-name': 'test2',
-                    'url': 'www.python.org'}
-        res = tab.create_document(data_doc, parent=subsec_id)
-        self.assertTrue('_error_msg' not in res)
-
-        doc2_id = [d for d in tab.document_elements() if d.data_id != doc1_id][0].data_id
-
         # edit subdocument
         data_doc = {'url': 'eee.python.org'}
         res_new = tab.edit_document(doc2_id, data_doc)
@@ -325,6 +829,7 @@ class ProductTest(SeleniumTestCase):
         self.assertEqual(0, len(tab.section_elements()))
         self.logout()
 
+    @replayable
     def test_edit_sections(self):
         self.go_to(self.pp_model, 'docs')
         # create
@@ -351,6 +856,7 @@ class ProductTest(SeleniumTestCase):
         self.assertEqual([], tab.section_elements())
         self.logout()
 
+    @replayable
     def test_edit_documents(self):
         self.go_to(self.pp_model, 'docs')
 
@@ -383,6 +889,7 @@ class ProductTest(SeleniumTestCase):
 
 
     def test_edit_people(self):
+        pers2 = str(self.given.person(self.pp_model, self.function2, 'pslama', 'new descr 2').pk)
         self.go_to(self.pp_model, 'people')
 
         # create
@@ -393,14 +900,7 @@ class ProductTest(SeleniumTestCase):
         res = tab.create_person(data)
         self.assertTrue('_error_msg' not in res)
 
-        pers1 = tab.person_elements()[0].data_id
-
-        data['description'] = 'new descr 2'
-        data['function'] = self.function2.name
-        res = tab.create_person(data)
-        self.assertTrue('_error_msg' not in res)
-
-        pers2 = [e for e in tab.person_elements() if e.data_id != pers1][0].data_id
+        pers1 = [e for e in tab.person_elements() if e.data_id != pers2][0].data_id
 
         # edit
         data['description'] = 'edit'
@@ -419,6 +919,8 @@ class ProductTest(SeleniumTestCase):
         self.logout()
 
     def test_edit_comms_meeting(self):
+        meet2 = str(self.given.meeting(self.pp_model, 'bang', day='Monday', time='10:00 am PT',
+                                       duration='1 hour weekly').pk)
         self.go_to(self.pp_model, 'comms')
 
         tab = CommsTab(self.wd)
@@ -430,12 +932,7 @@ class ProductTest(SeleniumTestCase):
                 'comment': 'foo bar baz\nUS CANADA'}
         res = tab.create_meeting(data)
         self.assertTrue('_error_msg' not in res)
-        meet1 = tab.meeting_elements()[0].data_id
-
-        data['meeting-title'] = 'bang'
-        res = tab.create_meeting(data)
-        self.assertTrue('_error_msg' not in res)
-        meet2 = [e for e in tab.meeting_elements() if e.data_id != meet1][0].data_id
+        meet1 = [e for e in tab.meeting_elements() if e.data_id != meet2][0].data_id
 
         # edit
         data['day'] = 'Friday'
@@ -453,6 +950,7 @@ class ProductTest(SeleniumTestCase):
 
         self.logout()
 
+    @replayable
     def test_edit_comms_irc(self):
         self.go_to(self.pp_model, 'comms')
 
@@ -487,6 +985,7 @@ class ProductTest(SeleniumTestCase):
         self.logout()
 
 
+    @replayable
     def test_edit_comms_maillists(self):
         self.go_to(self.pp_model, 'comms')
 
@@ -540,6 +1039,7 @@ class ReleaseTest(ProductTest):
         self.pp_model = self.release
         self.model_name = self.pp_model._meta.model_name
 
+    @replayable
     def test_bugzilla(self):
         self.go_to(self.pp_model, 'overview')
         tab = Bugzilla(self.wd)
@@ -553,6 +1053,7 @@ class ReleaseTest(ProductTest):
         self.assertTrue(data['product'] in tab.bugzilla_value())
 
 
+    @replayable
     def test_favourites(self):
         self.go_to(self.pp_model, 'overview')
 
@@ -570,6 +1071,7 @@ class ReleaseTest(ProductTest):
 
         self.assertEqual([], favourites_menu.favourite_elements())
 
+    @replayable
     def test_schedule_link(self):
         self.go_to(self.pp_model, 'overview')
 
@@ -584,6 +1086,7 @@ class ReleaseTest(ProductTest):
         self.assertTrue(path[-1] not in schedule_link.schedule())
 
 
+    @replayable
     def test_status_issues_edit(self):
         self.go_to(self.pp_model, 'statusrep')
         tab = StatusTab(self.wd)
@@ -606,6 +1109,7 @@ class ReleaseTest(ProductTest):
 
 
 
+    @replayable
     def test_status_edit(self):
         from pp.statuses.models import Subject, STATUSES, STATUS_GREEN, STATUS_HOLD
 
@@ -635,6 +1139,7 @@ class ReleaseTest(ProductTest):
         self.assertEqual([], tab.status_elements())
 
 
+    @replayable
     def test_status_overview(self):
         from pp.statuses.models import Subject, STATUSES, STATUS_GREEN, STATUS_HOLD
 
@@ -667,6 +1172,7 @@ class ReleaseTest(ProductTest):
         self.assertTrue(statuses[STATUS_HOLD] in " ".join(elements))
 
 
+    @replayable
     def test_status_rename(self):
         from pp.statuses.models import Subject
 
@@ -688,6 +1194,7 @@ class ReleaseTest(ProductTest):
         self.go_to(self.pp_model, 'statusrep')
         self.assertTrue(status_tab.status_elements()[0].text.startswith(data['item-name']))
 
+    @replayable
     def test_security(self):
         self.go_to(self.pp_model, 'security')
 
@@ -718,6 +1225,7 @@ class ReleaseTest(ProductTest):
         self.assertEqual("", tab.cpe_input)
         self.assertEqual("", tab.get_editor_text())
 
+    @replayable
     def test_copy_security_data_from(self):
         cpe_text = 'cpe'
         xml_text = 'xml'
@@ -735,3 +1243,268 @@ class ReleaseTest(ProductTest):
 
         self.assertEqual(cpe_text, tab.cpe_input)
         self.assertEqual(xml_text, tab.get_editor_text())
+
+
+class CommandBudgetTest(SimpleTestCase):
+    """
+    Page object methods declaring a command_budget must not send more
+    WebDriver commands than that. Runs against a stub driver, no browser
+    or live server involved.
+    """
+
+    def setUp(self):
+        # every element is found except form errors, forms have no values
+        executor = StubExecutor(absent=['.input-error'],
+                                scripts={FORM_VALUES_SCRIPT: {'values': {}, 'missing': []}})
+        self.wd = fake_driver(executor)
+
+    def assertWithinBudget(self, method, *args, **kwargs):
+        profile = self.wd.command_profile
+        profile.start(method.__name__)
+        method(*args, **kwargs)
+        commands = ['{command} {detail} ({origin})'.format(**r) for r in profile.records]
+        self.assertLessEqual(len(commands), method.command_budget,
+            '{0} sent {1} commands, its budget is {2}:\n{3}'.format(
+                method.__name__, len(commands), method.command_budget, '\n'.join(commands)))
+
+    def test_form_submit(self):
+        self.assertWithinBudget(DocumentForm().submit, self.wd)
+
+    def test_create_document(self):
+        tab = DocumentsTab(self.wd)
+        self.assertWithinBudget(tab.create_document, {'doc-name': 'doc', 'url': 'www.python.org'})
+
+    def test_edit_document(self):
+        tab = DocumentsTab(self.wd)
+        self.assertWithinBudget(tab.edit_document, '1', {'doc-name': 'doc'})
+
+    def test_create_section(self):
+        tab = DocumentsTab(self.wd)
+        self.assertWithinBudget(tab.create_section, {'section-name': 'section'})
+
+    def test_edit_status(self):
+        tab = StatusTab(self.wd)
+        self.assertWithinBudget(tab.edit_status, '1', {'status-title': 'status'})
+
+
+DOCUMENTS_PAGE = """
+<html><body>
+<div id="docs">
+  <a class="btn" href="#">Add</a>
+  <a id="btnAddNewDoc" href="#">Document</a>
+  <ul id="documents">
+    <li class="tree-branch" data-id="1">Specs
+      <ul>
+        <li class="tree-leaf" data-id="10" data-parent="1">Design
+          <button class="btn-remove-doc">Remove</button></li>
+      </ul>
+    </li>
+    <li class="tree-leaf" data-id="11">Roadmap
+      <button class="btn-remove-doc">Remove</button></li>
+  </ul>
+</div>
+<form id="document-form" class="hide">
+  <input id="doc-name"><input id="url">
+  <select id="doc-parent"><option value="">---</option><option value="1">Specs</option></select>
+  <button id="formAddNewDocumentSubmit">Save</button>
+</form>
+</body></html>
+"""
+
+
+@skipIf(lxml_html is None, 'needs lxml and cssselect')
+class FakeDomTest(SimpleTestCase):
+    """
+    Page objects driven against DomExecutor, an in-memory page standing in
+    for Firefox and the live server.
+    """
+    url = 'http://testserver/product/docs'
+
+    def setUp(self):
+        self.dom = DomExecutor({self.url: DOCUMENTS_PAGE})
+        self.dom.on_click('#btnAddNewDoc', self.show_form)
+        self.wd = fake_driver(self.dom)
+        self.wd.get(self.url)
+        self.tab = DocumentsTab(self.wd)
+
+    def show_form(self, dom, element):
+        dom.by_id('document-form').set('class', '')
+
+    def test_documents_tree(self):
+        self.assertEqual(['10', '11'], [d.data_id for d in self.tab.document_elements()])
+        self.assertEqual(['10'], [d.data_id for d in self.tab.document_elements(parent='1')])
+        self.assertEqual(['1'], [s.data_id for s in self.tab.section_elements()])
+        self.assertEqual('1', self.tab.document_element(10).parent_id)
+
+    def test_create_document(self):
+        submitted = []
+        self.dom.on_click('#formAddNewDocumentSubmit',
+            lambda dom, element: submitted.append(dom.form_values(['doc-name', 'url', 'doc-parent'])))
+        data = {'doc-name': 'Plan', 'url': 'www.python.org', 'doc-parent': 'Specs'}
+
+        result = self.tab.create_document(data)
+
+        values = {'doc-name': 'Plan', 'url': 'www.python.org', 'doc-parent': '1'}
+        self.assertEqual(values, result)
+        self.assertEqual([{'values': values, 'missing': []}], submitted)
+
+    def test_create_document_error(self):
+        def reject(dom, element):
+            dom.by_id('url').set('class', 'input-error')
+            dom.by_id('document-form').append(lxml_html.fragment_fromstring(
+                '<div class="tooltip-inner">Enter a valid URL.</div>'))
+        self.dom.on_click('#formAddNewDocumentSubmit', reject)
+
+        result = self.tab.create_document({'doc-name': 'Plan', 'url': 'python'})
+
+        self.assertEqual({'_error_msg': [{'url': {'Enter a valid URL.': 'python'}}]}, result)
+
+    def test_remove_document(self):
+        def confirm(dom, element):
+            dom.alert = 'Remove the document?'
+            dom.on_alert_accept = lambda dom: element.getparent().drop_tree()
+        self.dom.on_click('.btn-remove-doc', confirm)
+
+        self.tab.remove_document(11)
+
+        self.assertFalse(is_alert_present(self.wd))
+        self.assertEqual(['10'], [d.data_id for d in self.tab.document_elements()])
+
+
+@replayable
+class ScriptTest(SeleniumTestCase):
+    """
+    The scripts of elements.py run in Firefox. DomExecutor answers them in
+    Python, FakeDomTest does not tell whether the scripts themselves work.
+    """
+
+    def load(self, html):
+        # a page of the live server, the browser forbids cookies on data: urls
+        self.open(self.landing_path())
+        self.wd.execute_script('document.open(); document.write(arguments[0]); document.close();',
+                               html)
+
+    def test_fill_form(self):
+        self.load("""
+            <input id="name" onchange="this.setAttribute('data-changed', 'yes')">
+            <select id="parent"><option value="">---</option><option value="1"> Specs </option></select>
+            <input id="public" type="checkbox">
+            <textarea id="comment"></textarea>
+        """)
+        values = {'name': 'Plan', 'parent': 'Specs', 'public': True, 'comment': 'a\nb',
+                  'gone': 'x'}
+
+        missing = self.wd.execute_script(FILL_FORM_SCRIPT, values)
+
+        self.assertEqual(['gone'], missing)
+        self.assertEqual('Plan', self.wd.find_element_by_id('name').get_attribute('value'))
+        self.assertEqual('yes', self.wd.find_element_by_id('name').get_attribute('data-changed'))
+        self.assertEqual('1', self.wd.find_element_by_id('parent').get_attribute('value'))
+        self.assertTrue(self.wd.find_element_by_id('public').is_selected())
+        self.assertEqual('a\nb', self.wd.find_element_by_id('comment').get_attribute('value'))
+
+    def test_form_values(self):
+        self.load("""
+            <input id="name" value="Plan">
+            <select id="parent"><option value="">---</option><option value="1" selected>Specs</option></select>
+            <textarea id="comment">text</textarea>
+            <div id="box" value="attribute"></div>
+        """)
+
+        result = self.wd.execute_script(FORM_VALUES_SCRIPT, ['name', 'parent', 'comment', 'box', 'gone'])
+
+        self.assertEqual({'values': {'name': 'Plan', 'parent': '1', 'comment': 'text',
+                                     'box': 'attribute'},
+                          'missing': ['gone']}, result)
+
+    def test_scrape_rows(self):
+        self.load("""
+            <table><tbody>
+              <tr class="row" data-id="1" data-kind="doc"><td> Plan </td><td>www.python.org</td></tr>
+              <tr class="row" data-id="2" data-parent="1"><td>Spec</td><td></td></tr>
+              <tr class="row"><td>no id</td></tr>
+            </tbody></table>
+        """)
+
+        rows = scrape_rows(self.wd, 'tr.row', attributes=('data-kind',), cells='td')
+
+        self.assertEqual([(0, '1', None, ['Plan', 'www.python.org'], {'data-kind': 'doc'}),
+                          (1, '2', '1', ['Spec', ''], {'data-kind': None})],
+                         [(r.index, r.data_id, r.parent_id, r.cells, r.attributes) for r in rows])
+        self.assertEqual(['1', '2', None],
+                         [r.data_id for r in scrape_rows(self.wd, 'tr.row', require_id=False)])
+
+    def test_tree_snapshot(self):
+        self.load(DOCUMENTS_PAGE)
+
+        tree = TreeSnapshot(self.wd, '#documents')
+
+        self.assertEqual([('branch', 0, '1', None, [], 'Specs'),
+                          ('leaf', 0, '10', '1', ['1'], 'Design Remove'),
+                          ('leaf', 1, '11', None, [], 'Roadmap Remove')],
+                         [(n.kind, n.index, n.data_id, n.parent_id, n.ancestor_ids, n.label)
+                          for n in tree.nodes])
+        self.assertEqual(['10'], [n.data_id for n in tree.descendants('1', kind='leaf')])
+
+
+@skipIf(lxml_html is None, 'needs lxml and cssselect')
+class ReplayTest(SimpleTestCase):
+    """
+    A recording made against one live server replayed against another,
+    the in-memory DOM plays the browser during the recording.
+    """
+    data = {'doc-name': 'Plan', 'url': 'www.python.org'}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        dom = DomExecutor({'http://localhost:8081/product/docs': DOCUMENTS_PAGE})
+        driver = fake_driver(dom)
+        recording = record(driver, self.directory)
+        recording.start('create', 'http://localhost:8081')
+        driver.get('http://localhost:8081/product/docs')
+        self.recorded = DocumentsTab(driver).create_document(self.data)
+        # recorded for test_replay, which reads the url after the form
+        self.assertEqual('http://localhost:8081/product/docs#', driver.current_url)
+        recording.stop()
+
+        self.replay = ReplayExecutor(self.directory)
+        self.wd = fake_driver(self.replay)
+        self.replay.start('create', 'http://localhost:9000')
+
+    def test_replay(self):
+        self.wd.get('http://localhost:9000/product/docs')
+        self.assertEqual(self.recorded, DocumentsTab(self.wd).create_document(self.data))
+        self.assertEqual('http://localhost:9000/product/docs#', self.wd.current_url)
+        self.replay.stop()
+
+    def test_replay_mismatch(self):
+        self.wd.get('http://localhost:9000/product/docs')
+        with self.assertRaises(ReplayMismatch):
+            DocumentsTab(self.wd).create_section({'section-name': 'Specs'})
+
+    def test_unsent_commands(self):
+        self.wd.get('http://localhost:9000/product/docs')
+        with self.assertRaises(ReplayMismatch):
+            self.replay.stop()
+
+
+class PartitionSuiteTest(SimpleTestCase):
+    def case(self, name, *methods):
+        attrs = dict((method, lambda self: None) for method in methods)
+        return defaultTestLoader.loadTestsFromTestCase(type(name, (SimpleTestCase,), attrs))
+
+    def partition(self, shards):
+        suite = TestSuite([self.case('First', 'test_a', 'test_b', 'test_c'),
+                           TestSuite([self.case('Second', 'test_d', 'test_e')])])
+        return [['{0}.{1}'.format(type(test).__name__, test._testMethodName) for test in shard]
+                for shard in partition_suite_by_method(suite, shards)]
+
+    def test_round_robin(self):
+        self.assertEqual([['First.test_a', 'First.test_c', 'Second.test_e'],
+                          ['First.test_b', 'Second.test_d']], self.partition(2))
+
+    def test_empty_shards_dropped(self):
+        self.assertEqual([['First.test_a'], ['First.test_b'], ['First.test_c'],
+                          ['Second.test_d'], ['Second.test_e']], self.partition(8))